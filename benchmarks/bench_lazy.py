@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""
+Compares listing of names and comments of tables and views
+with db.iter_objects (columns and privileges parsed lazily)
+and with db.parse_schema.
+
+Generates DDL (see ddlgen.py) of N tables (first argument,
+1000 by default) with M columns (second argument, 30 by default)
+and prints best of 3 times of: listing names and comments,
+and reading all columns and privileges of the objects as well.
+"""
+
+import os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sql2asciidoc import db
+import ddlgen
+
+def names(objects):
+    return [(o.name, o.desc) for o in objects]
+
+def everything(objects):
+    return [(o.name, o.desc, [(c.name, c.type, c.desc) for c in o.cols],
+             sorted(o.permits)) for o in objects]
+
+def best_time(func, sql, repeat=3):
+    ret = None
+    for i in range(repeat):
+        t = time.time()
+        func(sql)
+        t = time.time() - t
+        ret = t if ret is None else min(ret, t)
+    return ret
+
+def main(argv):
+    ntables = int(argv[1]) if len(argv) > 1 else 1000
+    ncols = int(argv[2]) if len(argv) > 2 else 30
+
+    sql = ddlgen.generate(ntables, ncols)
+    assert names(db.iter_objects(sql)) == names(db.parse_schema(sql).objects())
+
+    print "%-12s %12s %12s" % ("", "parse_schema", "iter_objects")
+    for title, func in [('names', names), ('everything', everything)]:
+        eager = best_time(lambda sql: func(db.parse_schema(sql).objects()), sql)
+        lazy = best_time(lambda sql: func(db.iter_objects(sql)), sql)
+        print "%-12s %11.3fs %11.3fs" % (title, eager, lazy)
+
+if __name__ == "__main__":
+    main(sys.argv)
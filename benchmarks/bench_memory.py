@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+Measures memory, taken by the schema object model.
+
+Builds N tables (first argument, 2000 by default) with
+M columns each (second argument, 30 by default) and grants
+to a few schemas for each table, and prints total size
+of the model, found by walking references of the objects.
+"""
+
+import gc, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sql2asciidoc import db
+
+TYPES = ['NUMBER', 'NUMBER(10)', 'VARCHAR2(100)', 'DATE', 'CHAR(1)']
+SCHEMAS = ['APP', 'REPORTING', 'AUDIT']
+
+def build(ntables, ncols):
+    tables = []
+    for i in xrange(ntables):
+        t = db.Table("hr.table_%d" % i, "Table number %d" % i)
+        for j in xrange(ncols):
+            # Types are built dynamically, as if parsed from SQL
+            t.add_column("column_%d" % j, TYPES[j % len(TYPES)][:].lower().upper(),
+                         j % 2 == 0, None, "Column %d of table %d" % (j, i))
+        for s in SCHEMAS:
+            t.grant(s, 'SELECT')
+        t.revoke(SCHEMAS[0], 'DELETE')
+        tables.append(t)
+    return tables
+
+def sizeof(root):
+    """
+    Returns total size of root and all objects, referenced
+    from it (except classes, modules and functions)
+    """
+    seen = set()
+    stack = [root]
+    total = 0
+    skip = (type, type(sys), type(sizeof))
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, skip):
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        stack.extend(gc.get_referents(o))
+    return total
+
+def main(argv):
+    ntables = int(argv[1]) if len(argv) > 1 else 2000
+    ncols = int(argv[2]) if len(argv) > 2 else 30
+
+    t = time.time()
+    tables = build(ntables, ncols)
+    t = time.time() - t
+
+    size = sizeof(tables)
+    print "Tables: %d, columns: %d" % (ntables, ntables * ncols)
+    print "Build time: %.3f s" % t
+    print "Model size: %.1f MB (%d bytes per column)" % (
+        size / 1048576.0, size // (ntables * ncols))
+
+if __name__ == "__main__":
+    main(sys.argv)
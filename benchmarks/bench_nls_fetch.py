@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+Measures fetching and rendering of wide string-heavy results
+with NLS decoding.
+
+Fills in-memory SQLite table of N rows (first argument, 20000
+by default) and M columns (second argument, 40 by default),
+mostly of non-ASCII UTF-8 strings, fetched as byte strings,
+and partly of numbers. The cursor reports DB-API types of the
+columns, as cx_Oracle does. Compares decoding of each cell of
+fetched rows in a separate pass (as was done before) with
+decoding of only string columns at fetch time (iter_query).
+"""
+
+import os, sqlite3, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sql2asciidoc import oracle2asciidoc as o2a
+
+ENCODING = 'utf8'
+
+# DB-API type objects of TypedCursor
+STRING = 'STRING'
+NUMBER = 'NUMBER'
+
+class TypedCursor(object):
+    """
+    SQLite cursor, reporting types of columns
+    in description by their declared types
+    """
+
+    def __init__(self, cursor, types):
+        self._cursor = cursor
+        self._types = types
+        self.arraysize = cursor.arraysize
+
+    @property
+    def description(self):
+        return [(d[0], self._types.get(d[0], STRING)) + tuple(d[2:])
+                for d in self._cursor.description]
+
+    def execute(self, sql):
+        self._cursor.arraysize = self.arraysize
+        return self._cursor.execute(sql)
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+    def close(self):
+        self._cursor.close()
+
+def create(nrows, ncols):
+    connection = sqlite3.connect(':memory:')
+    connection.text_factory = str
+    cols = ["c%d" % j for j in range(ncols)]
+    connection.execute("create table t (id integer, %s)" % ", ".join(cols))
+    word = u"\u0442\u0435\u043a\u0441\u0442 text".encode(ENCODING)
+    def value(i, j):
+        if j % 4 == 0:
+            return i * j
+        return "%s %d" % (word, i * j) if j % 5 else None
+    connection.executemany(
+        "insert into t values (?%s)" % (", ?" * ncols),
+        ([i] + [value(i, j) for j in range(ncols)] for i in xrange(nrows)))
+    types = dict([("c%d" % j, NUMBER) for j in range(0, ncols, 4)])
+    types['id'] = NUMBER
+    return connection, types
+
+def post_pass(cursor, sql):
+    # Decoding of every cell of each row after fetch
+    cursor.execute(sql)
+    for rows in o2a.iter_batches(cursor):
+        yield [tuple([isinstance(b, basestring) and unicode(b, ENCODING) or b
+                      for b in row]) for row in rows]
+
+def at_fetch(cursor, sql):
+    return o2a.iter_query(cursor, sql, ENCODING)
+
+def run(func, connection, types, sql):
+    cursor = TypedCursor(connection.cursor(), types)
+    t = time.time()
+    n = size = 0
+    for rows in func(cursor, sql):
+        n += len(rows)
+        size += len(o2a.make_asciidoc(rows))
+    t = time.time() - t
+    cursor.close()
+    return t, n, size
+
+def main(argv):
+    nrows = int(argv[1]) if len(argv) > 1 else 20000
+    ncols = int(argv[2]) if len(argv) > 2 else 40
+
+    connection, types = create(nrows, ncols)
+    sql = "select * from t"
+
+    results = {}
+    for name, func in [('post-pass', post_pass), ('at fetch', at_fetch)]:
+        t, n, size = run(func, connection, types, sql)
+        results[name] = size
+        print "%-10s %8.3f s  (%d rows, %d characters)" % (name, t, n, size)
+
+    assert len(set(results.values())) == 1
+
+if __name__ == "__main__":
+    main(sys.argv)
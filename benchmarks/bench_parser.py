@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Benchmark of parsing of CREATE TABLE and CREATE VIEW statements
+on pathological input.
+
+Builds scripts of growing number of statements (doubling from 500
+up to the number specified as the first argument, 16000 by default)
+of kinds, which made the former regular expressions (kept below
+for comparison) scan the rest of the script for each statement:
+tables with clauses after the list of columns, nested parentheses
+and scaled numbers, views with subqueries in the select list,
+and an unterminated statement at the end.
+
+Prints time per 1000 statements of db.parse_schema for each size.
+Constant time shows linear scaling. The former expressions are
+timed as well, up to the number of statements specified as the
+second argument (4000 by default), as their time grows quadratically.
+"""
+
+import os, re, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sql2asciidoc import db
+
+BLOCK = """
+create table hr.t_%(i)d (
+  id number(10,2) primary key not null,
+  amount number(12, 4) default (1 + nvl(2, 3)) not null,
+  name varchar2(100 char) default 'a, (b' null,
+  constraint t_%(i)d_uk unique (name, amount)
+) partition by range (id) (partition p1 values less than (10)) pctfree 10;
+create view hr.v_%(i)d as
+select t.id, (select max(x) from dual) as m, t.name n
+  from hr.t_%(i)d t;
+"""
+
+# Unterminated statement at the end of script
+TAIL = "create table hr.unterminated (id number(10), name varchar2(10)"
+
+# Former expressions for CREATE TABLE and CREATE VIEW statements
+LEGACY_RX_TABLE = re.compile(
+    r"\bCREATE\s+TABLE\s+"
+    r"(?P<tablename>([\w\$]+\.|\"[\w\$]+\"\.)?([\w\$]+|\"[\w\$]+\"))"
+    r"\s*\((?P<columns>.*?)\)\s*(;|tablespace .*?;)",
+    re.DOTALL | re.IGNORECASE)
+
+LEGACY_RX_VIEW = re.compile(
+    r"\bCREATE\s+(?:OR\s+REPLACE\s+)?VIEW\s(?P<tablename>[\w\$]*\.?[\w\$]+)\b"
+    r"\s*(\((?P<aliases>[\s\w\$,]*)\))?\s*\bAS\s+SELECT\s+(?P<columns>.*?)"
+    r"\bFROM\s+(?P<sources>.*?)(?P<isunion>\bUNION\b(\s+ALL\b)?.*?)?"
+    r"(?:(\bWHERE\b)|(\bORDER\s+BY\b)|(\bGROUP\s+BY\b)|;)",
+    re.DOTALL | re.IGNORECASE)
+
+def generate(n):
+    """
+    Returns script of n statements
+    """
+    return "".join([BLOCK % {'i': i} for i in xrange(n // 2)]) + TAIL
+
+def parse_legacy(sql):
+    return (list(LEGACY_RX_TABLE.finditer(sql)),
+            list(LEGACY_RX_VIEW.finditer(sql)))
+
+def main(argv):
+    max_n = int(argv[1]) if len(argv) > 1 else 16000
+    max_legacy = int(argv[2]) if len(argv) > 2 else 4000
+
+    print "%10s %12s %12s %12s" % ("Statements", "Time, s", "s/1000", "Former s/1000")
+    n = 500
+    while n <= max_n:
+        sql = generate(n)
+
+        t = time.time()
+        schema = db.parse_schema(sql)
+        t = time.time() - t
+        assert len(schema.tables) == len(schema.views) == n // 2
+
+        legacy = ""
+        if n <= max_legacy:
+            tl = time.time()
+            parse_legacy(sql)
+            tl = time.time() - tl
+            legacy = "%12.4f" % (tl * 1000 / n)
+
+        print "%10d %12.3f %12.4f %12s" % (n, t, t * 1000 / n, legacy)
+        n *= 2
+
+if __name__ == "__main__":
+    main(sys.argv)
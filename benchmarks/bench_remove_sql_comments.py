@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+Benchmark of the SQL comment stripper.
+
+Feeds synthetic DDL of growing size (doubling from 1 MB up to
+the size specified in MB as the first argument, 64 by default)
+chunk by chunk to db.iter_strip_sql_comments and prints time
+per megabyte for each size. Constant time per megabyte shows
+linear scaling; the input is never held in memory entirely,
+so gigabyte sizes may be passed as well:
+
+    python benchmarks/bench_remove_sql_comments.py 1024
+"""
+
+import os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sql2asciidoc import db
+
+# A block of DDL, containing all kinds of lexemes
+BLOCK = """
+/* Table of employees
+   -- with nested line comment marker */
+create table hr.employees (
+  id number(10) primary key not null, -- surrogate key
+  name varchar2(100) not null,
+  "Status" varchar2(10) default 'A--B /* not a comment */'
+) tablespace users;
+comment on table hr.employees is 'It''s -- still a string';
+"""
+
+MB = 1024 * 1024
+
+def iter_chunks(size, chunk_size=MB):
+    """
+    Yields chunks of synthetic SQL of total length not less than size
+    """
+    chunk = BLOCK * (chunk_size // len(BLOCK) + 1)
+    for i in xrange(0, size, len(chunk)):
+        yield chunk
+
+def main(argv):
+    max_mb = int(argv[1]) if len(argv) > 1 else 64
+
+    print "%10s %12s %12s %10s" % ("Size, MB", "Time, s", "s/MB", "MB/s")
+    mb = 1
+    while mb <= max_mb:
+        t = time.time()
+        n = 0
+        for s in db.iter_strip_sql_comments(iter_chunks(mb * MB)):
+            n += len(s)
+        t = time.time() - t
+        print "%10d %12.3f %12.4f %10.2f" % (mb, t, t / mb, mb / t)
+        mb *= 2
+
+if __name__ == "__main__":
+    main(sys.argv)
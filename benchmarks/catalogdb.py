@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Builder of SQLite stand-in of Oracle data dictionary, to read
+it with catalog mode of ddl2asciidoc (--catalog, --driver=sqlite).
+
+    Usage:
+        python benchmarks/catalogdb.py [options] catalog.db
+
+    Options:
+        -t, --tables=N
+            Number of tables. Default: 100
+        -c, --columns=M
+            Number of columns of each table. Default: 20
+        -w, --views=N
+            Number of views. Default: tables / 4
+        -s, --seed=SEED
+            Seed of random generator. Default: 0
+
+Objects are generated with ddlgen.py, parsed and stored into
+ALL_TABLES, ALL_TAB_COLUMNS, ALL_TAB_COMMENTS, ALL_COL_COMMENTS,
+ALL_TAB_PRIVS and ALL_VIEWS tables of the database.
+"""
+
+import getopt, os, re, sqlite3, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sql2asciidoc import db
+import ddlgen
+
+CATALOG_DDL = """
+create table all_tables (owner, table_name);
+create table all_tab_columns (owner, table_name, column_name, column_id,
+    data_type, data_length, char_length, data_precision, data_scale,
+    nullable, data_default);
+create table all_tab_comments (owner, table_name, table_type, comments);
+create table all_col_comments (owner, table_name, column_name, comments);
+create table all_tab_privs (grantor, grantee, table_schema, table_name,
+    privilege);
+create table all_views (owner, view_name, text);
+"""
+
+# Type of column, as parsed from DDL
+RX_TYPE = re.compile(r"(\w+)\s*(?:\((\d+)(?:,(\d+))?\))?")
+
+def split_name(nm):
+    owner, tmp, nm = db.normalize_name(nm).upper().rpartition('.')
+    return owner or 'HR', nm
+
+def column_row(owner, tnm, i, c):
+    tp, size, scale = RX_TYPE.match(c.type.upper()).groups()
+    size = size and int(size)
+    length = precision = None
+    if tp in ('NUMBER', 'FLOAT'):
+        precision = size
+        scale = scale and int(scale) or (0 if size else None)
+    else:
+        length = size
+    return (owner, tnm, c.name.upper(), i + 1, tp, length, length,
+            precision, scale, 'Y' if c.nullable else 'N', c.default)
+
+def create(connection, schema):
+    """
+    Creates catalog tables and stores objects of schema into them
+    """
+
+    connection.executescript(CATALOG_DDL)
+
+    for obj in schema.objects():
+        owner, nm = split_name(obj.name)
+        is_view = isinstance(obj, db.View)
+        if is_view:
+            text = re.split(r"(?i)\bas\s", obj.text, 1)[-1]
+            connection.execute("insert into all_views values (?, ?, ?)",
+                               (owner, nm, text.strip().rstrip(';')))
+        else:
+            connection.execute("insert into all_tables values (?, ?)",
+                               (owner, nm))
+        connection.execute("insert into all_tab_comments values (?, ?, ?, ?)",
+                           (owner, nm, is_view and 'VIEW' or 'TABLE', obj.desc))
+
+        for i, c in enumerate(obj.cols):
+            if is_view:
+                row = (owner, nm, c.name.upper(), i + 1, 'VARCHAR2',
+                       4000, 4000, None, None, 'Y', None)
+            else:
+                row = column_row(owner, nm, i, c)
+            connection.execute("insert into all_tab_columns values "
+                               "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+            connection.execute("insert into all_col_comments values (?, ?, ?, ?)",
+                               (owner, nm, c.name.upper(), c.desc))
+
+        # Only the privileges, granted at the end of the script
+        granted = {}
+        for privilege, grantee, permit in schema.grants.get(db.normalize_name(obj.name), ()):
+            granted[grantee.upper(), permit.upper()] = privilege == 'grant'
+        for (grantee, permit), is_granted in sorted(granted.items()):
+            if is_granted:
+                connection.execute("insert into all_tab_privs values (?, ?, ?, ?, ?)",
+                                   (owner, grantee, owner, nm, permit))
+
+    connection.commit()
+
+def main(argv):
+    params = {}
+    try:
+        opts, args = getopt.getopt(
+            argv[1:], "t:c:w:s:h",
+            ["tables=", "columns=", "views=", "seed=", "help"])
+        for o, a in opts:
+            if o in ("-t", "--tables"):
+                params['ntables'] = int(a)
+            elif o in ("-c", "--columns"):
+                params['ncols'] = int(a)
+            elif o in ("-w", "--views"):
+                params['nviews'] = int(a)
+            elif o in ("-s", "--seed"):
+                params['seed'] = int(a)
+            elif o in ("-h", "--help"):
+                print __doc__
+                return 0
+        if len(args) != 1:
+            raise getopt.GetoptError("Database file not specified.")
+    except (getopt.GetoptError, ValueError), err:
+        print __doc__
+        print "Error: %s" % err
+        return -2
+
+    if os.path.exists(args[0]):
+        os.remove(args[0])
+
+    schema = db.parse_schema(ddlgen.generate(**params))
+    connection = sqlite3.connect(args[0])
+    create(connection, schema)
+    connection.close()
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""
+Generator of synthetic Oracle DDL for benchmarks.
+
+    Usage:
+        python benchmarks/ddlgen.py [options] > schema.sql
+
+    Options:
+        -t, --tables=N
+            Number of tables. Default: 100
+        -c, --columns=M
+            Number of columns of each table. Default: 20
+        -w, --views=N
+            Number of views. Default: tables / 4
+        -s, --seed=SEED
+            Seed of random generator. Default: 0
+
+The script contains CREATE TABLE statements (some with quoted
+identifiers, defaults, primary keys and tablespace clauses),
+COMMENT ON TABLE/COLUMN statements, GRANT and REVOKE statements,
+and views with nested function calls, aliases and UNIONs,
+interleaved with line and block comments.
+"""
+
+import getopt, random, sys
+
+TYPES = ['NUMBER', 'NUMBER(10)', 'VARCHAR2(30)', 'VARCHAR2(4000)',
+         'DATE', 'CHAR(1)', 'CLOB', 'TIMESTAMP(6)']
+SCHEMAS = ['APP', 'REPORTING', 'AUDIT', 'ETL']
+PERMITS = ['SELECT', 'INSERT', 'UPDATE', 'DELETE']
+WORDS = ['identifier', 'name', 'status', 'amount', 'date', 'code',
+         'reference', 'owner', 'flag', 'description']
+
+def table_name(i):
+    """
+    Returns name of i-th table, as written in DDL
+    """
+    if i % 10 == 3:
+        return '"HR"."TABLE_%d"' % i
+    return 'hr.table_%d' % i
+
+def column_name(j):
+    if j % 15 == 7:
+        return '"COL_%d"' % j
+    return 'col_%d' % j
+
+def comment(rnd):
+    return "The %s of the %s; it''s %s" % (
+        rnd.choice(WORDS), rnd.choice(WORDS), rnd.choice(WORDS))
+
+def iter_table(rnd, i, ncols):
+    """
+    Yields statements, creating i-th table with comments and grants
+    """
+
+    tnm = table_name(i)
+    cols = []
+    for j in range(ncols):
+        c = "  %s %s" % (column_name(j), rnd.choice(TYPES))
+        if j == 0:
+            c += " primary key not null"
+        elif j % 5 == 1:
+            c += " default %s" % rnd.choice(["0", "'N'", "sysdate"])
+        if j % 3 == 2:
+            c += " not null"
+        if j < ncols - 1:
+            c += ","
+        if j % 7 == 4:
+            c += " -- %s" % rnd.choice(WORDS)
+        cols.append(c)
+
+    yield "/* Table %d\n   generated by ddlgen */\n" % i
+    yield "create table %s (\n%s\n)%s;\n\n" % (
+        tnm, "\n".join(cols), " tablespace users" if i % 2 else "")
+
+    yield "comment on table %s is '%s';\n" % (tnm, comment(rnd))
+    for j in range(ncols):
+        if rnd.random() < 0.8:
+            yield "comment on column %s.%s is '%s';\n" % (
+                tnm, column_name(j).strip('"'), comment(rnd))
+
+    for s in SCHEMAS:
+        if rnd.random() < 0.5:
+            yield "grant %s on %s to %s;\n" % (rnd.choice(PERMITS), tnm, s)
+    if rnd.random() < 0.2:
+        yield "revoke %s on %s to %s;\n" % (rnd.choice(PERMITS), tnm, rnd.choice(SCHEMAS))
+    yield "\n"
+
+def iter_view(rnd, i, ntables, ncols):
+    """
+    Yields statements, creating i-th view with comments and grants
+    """
+
+    def select(n):
+        # Tables with quoted names are not selected from
+        k = rnd.randrange(ntables)
+        t = 'hr.table_%d' % (k - 1 if k % 10 == 3 else k)
+        exprs = []
+        for j in range(n):
+            c = 't.col_%d' % rnd.randrange(ncols)
+            k = j % 4
+            if k == 1:
+                c = "nvl(substr(%s, 1, 10), 'n/a')" % c
+            elif k == 2:
+                c = "decode(%s, 'A', 'Active', 'I', 'Inactive', (select 'x' from dual))" % c
+            exprs.append("%s as alias_%d" % (c, j) if k else c)
+        return "select %s\n  from %s t" % (",\n         ".join(exprs), t)
+
+    vnm = 'hr.view_%d' % i
+    n = rnd.randint(2, 8)
+
+    yield "-- View %d\n" % i
+    if i % 5 == 4:
+        yield "create or replace view %s as\n%s\nunion all\n%s;\n" % (
+            vnm, select(n), select(n))
+    else:
+        yield "create or replace view %s as\n%s\n where t.col_0 > 0;\n" % (
+            vnm, select(n))
+
+    yield "comment on table %s is '%s';\n" % (vnm, comment(rnd))
+    yield "grant select on %s to %s;\n\n" % (vnm, rnd.choice(SCHEMAS))
+
+def iter_ddl(ntables=100, ncols=20, nviews=None, seed=0):
+    """
+    Yields synthetic DDL script by statements
+    """
+
+    rnd = random.Random(seed)
+    if nviews is None:
+        nviews = ntables // 4
+
+    for i in range(ntables):
+        for s in iter_table(rnd, i, ncols):
+            yield s
+    for i in range(nviews):
+        for s in iter_view(rnd, i, ntables, ncols):
+            yield s
+
+def generate(ntables=100, ncols=20, nviews=None, seed=0):
+    """
+    Returns synthetic DDL script (see iter_ddl)
+    """
+
+    return "".join(iter_ddl(ntables, ncols, nviews, seed))
+
+def main(argv):
+    params = {}
+    try:
+        opts, args = getopt.getopt(
+            argv[1:], "t:c:w:s:h",
+            ["tables=", "columns=", "views=", "seed=", "help"])
+        for o, a in opts:
+            if o in ("-t", "--tables"):
+                params['ntables'] = int(a)
+            elif o in ("-c", "--columns"):
+                params['ncols'] = int(a)
+            elif o in ("-w", "--views"):
+                params['nviews'] = int(a)
+            elif o in ("-s", "--seed"):
+                params['seed'] = int(a)
+            elif o in ("-h", "--help"):
+                print __doc__
+                return 0
+    except (getopt.GetoptError, ValueError), err:
+        print __doc__
+        print "Error: %s" % err
+        return -2
+
+    for s in iter_ddl(**params):
+        sys.stdout.write(s)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+"""
+Benchmark suite of the DDL parser and renderer.
+
+    Usage:
+        python benchmarks/run.py [options]
+
+    Options:
+        -t, --tables=N
+            Number of generated tables. Default: 500
+        -c, --columns=M
+            Number of columns of each table. Default: 20
+        -w, --views=N
+            Number of generated views. Default: tables / 4
+        -r, --repeat=R
+            Number of runs of each benchmark; the best time
+            is recorded. Default: 3
+        -o, --output=FILENAME
+            Write results in JSON format to FILENAME.
+        -b, --baseline=FILENAME
+            Compare results with JSON file of a previous run.
+        -h, --help
+            Display this help message.
+
+Synthetic DDL is made by ddlgen.py. Each stage is timed separately:
+remove_sql_comments, parse_tables, parse_views, tables_to_asciidoc,
+views_to_asciidoc and make_title_references.
+"""
+
+import getopt, json, os, platform, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sql2asciidoc import db, asciidoc, script_tools
+import ddlgen
+
+def best_time(func, repeat):
+    """
+    Runs func repeat times, returns its result and the best time
+    """
+
+    best = None
+    for i in range(repeat):
+        t = time.time()
+        ret = func()
+        t = time.time() - t
+        if best is None or t < best:
+            best = t
+    return ret, best
+
+def run(ntables, ncols, nviews, repeat):
+    """
+    Runs benchmarks and returns dictionary of results
+    """
+
+    sql = ddlgen.generate(ntables, ncols, nviews)
+    schema = db.parse_schema(sql)
+    doc = script_tools.schema_to_asciidoc(schema, "=", "~")
+
+    benchmarks = [
+        ('remove_sql_comments', lambda: db.remove_sql_comments(sql)),
+        ('parse_tables', lambda: db.parse_tables(sql)),
+        ('parse_views', lambda: db.parse_views(sql)),
+        ('tables_to_asciidoc', lambda: script_tools.tables_to_asciidoc(schema)),
+        ('views_to_asciidoc', lambda: script_tools.views_to_asciidoc(schema)),
+        ('make_title_references', lambda: asciidoc.make_title_references(doc)),
+    ]
+
+    results = {}
+    for name, func in benchmarks:
+        ret, t = best_time(func, repeat)
+        results[name] = {
+            'seconds': t,
+            'items': len(ret),
+        }
+        sys.stderr.write("%-24s %10.4f s\n" % (name, t))
+
+    return {
+        'params': {
+            'tables': ntables,
+            'columns': ncols,
+            'views': nviews,
+            'repeat': repeat,
+            'sql_bytes': len(sql),
+            'doc_bytes': len(doc),
+        },
+        'python': platform.python_version(),
+        'timestamp': time.time(),
+        'results': results,
+    }
+
+def compare(results, baseline):
+    """
+    Prints times of results relative to baseline
+    """
+
+    print "%-24s %10s %10s %8s" % ("Benchmark", "Baseline", "Current", "Ratio")
+    for name in sorted(results['results']):
+        cur = results['results'][name]['seconds']
+        base = baseline['results'].get(name, {}).get('seconds')
+        if base:
+            print "%-24s %10.4f %10.4f %8.2f" % (name, base, cur, cur / base)
+        else:
+            print "%-24s %10s %10.4f %8s" % (name, "-", cur, "-")
+
+def main(argv):
+    ntables = 500
+    ncols = 20
+    nviews = None
+    repeat = 3
+    outfile = None
+    basefile = None
+
+    try:
+        opts, args = getopt.getopt(
+            argv[1:], "t:c:w:r:o:b:h",
+            ["tables=", "columns=", "views=", "repeat=", "output=",
+             "baseline=", "help"])
+        for o, a in opts:
+            if o in ("-t", "--tables"):
+                ntables = int(a)
+            elif o in ("-c", "--columns"):
+                ncols = int(a)
+            elif o in ("-w", "--views"):
+                nviews = int(a)
+            elif o in ("-r", "--repeat"):
+                repeat = int(a)
+            elif o in ("-o", "--output"):
+                outfile = a
+            elif o in ("-b", "--baseline"):
+                basefile = a
+            elif o in ("-h", "--help"):
+                print __doc__
+                return 0
+    except (getopt.GetoptError, ValueError), err:
+        print __doc__
+        print "Error: %s" % err
+        return -2
+
+    if nviews is None:
+        nviews = ntables // 4
+
+    results = run(ntables, ncols, nviews, repeat)
+
+    if outfile:
+        f = open(outfile, "w")
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.close()
+
+    if basefile:
+        f = open(basefile)
+        compare(results, json.load(f))
+        f.close()
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
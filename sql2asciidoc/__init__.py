@@ -1,3 +1,9 @@
 import script_tools
 import db
 import oracle2asciidoc
+import cache
+import stats
+import dbapi
+import catalog
+import lineage
+import watch
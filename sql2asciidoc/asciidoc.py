@@ -7,28 +7,111 @@ Different methods for ASCIIDOC formatting/reformatting
 
 import re
 
-def make_title_references(dest, src=None):
+# Title, underlined with one of title characters
+RX_TITLE = re.compile(r"^(\w.*)\n([=\^\+~-]+)$", re.MULTILINE)
+
+# Listing block with source code
+RXX_SOURCE_BLOCK = r"^\[source\b[^\]\n]*\]\n(?P<delim>-{4,})\n.*?^(?P=delim)$"
+
+# Line of hyphens, such as delimiter of listing block
+RX_HYPHENS_LINE = re.compile(r"^-{4,}$", re.MULTILINE)
+
+def find_titles(src):
     """
-    Finds titles in src, makes links in dest and returns it
+    Finds titles in src and returns them as list
     """
 
-    if not src:
-        src = dest
+    return [a for a, b in RX_TITLE.findall(src) if len(a)==len(b)]
+
+def listing_delimiter(text, length=60):
+    """
+    Returns delimiter of listing block, containing text:
+    line of hyphens, longer than any such line of the text
+    and at least of specified length.
+    """
+
+    for line in RX_HYPHENS_LINE.findall(text):
+        length = max(length, len(line) + 1)
+
+    return "-" * length
+
+def anchored(t):
+    """
+    Returns reference to the title t
+    """
+
+    return "<<_%s,%s>>" % (re.sub("\W", "_", t).strip("_").lower(),t)
+
+def _trie_pattern(words):
+    """
+    Returns regular expression, matching any of words.
+    The words are arranged in a prefix tree, so matching at
+    each position costs no more than length of the longest word,
+    regardless of the number of words. Longer words are preferred.
+    """
 
-    # List of found titles
-    titles = []
+    trie = {}
+    for w in words:
+        node = trie
+        for c in w:
+            node = node.setdefault(c, {})
+        node[''] = None
 
-    # Find titles in src
-    rx = re.compile(r"^(\w.*)\n([=\^\+~-]+)$", re.MULTILINE)
-    for a, b in rx.findall(src):
-        if len(a)==len(b):
-            titles.append(a)
+    def pattern(node):
+        alts = [re.escape(c) + pattern(node[c]) for c in sorted(node) if c]
+        if not alts:
+            return ''
+        rx = alts[0] if len(alts)==1 else '(?:%s)' % '|'.join(alts)
+        return '(?:%s)?' % rx if '' in node else rx
 
-    # Replace
-    def anchored(t):
-        return "<<_%s,%s>>" % (re.sub("\W", "_", t).strip("_").lower(),t)
-    for a in titles:
-        dest = re.sub("(?i)(\\b%s\\b)(?!\\n[=\\^\\+~-]+)([^>]{2})" % re.escape(a), "%s\\2" % anchored(a), dest)
+    return pattern(trie)
+
+class TitleLinker(object):
+    """
+    Makes links to the titles in text in a single scan.
+
+    Titles are matched by whole words, case-insensitively,
+    except the titles themselves (followed by underline)
+    and text, already made a link. If skip_source is True,
+    [source,...] listing blocks are left untouched.
+    """
+
+    def __init__(self, titles, skip_source=False):
+
+        # Lowercase title to the title, as found first
+        self.titles = {}
+        for t in titles:
+            self.titles.setdefault(t.lower(), t)
+
+        rx = ""
+        if self.titles:
+            rx = r"\b(?P<title>%s)\b(?!\n[=\^\+~-]+)(?=[^>]{2})" % \
+                    _trie_pattern(self.titles.keys())
+            if skip_source:
+                rx = r"(?P<source>%s)|%s" % (RXX_SOURCE_BLOCK, rx)
+        self.rx = rx and re.compile(rx, re.IGNORECASE | re.MULTILINE | re.DOTALL)
+
+    def _replace(self, m):
+        if m.group('title') is None:
+            return m.group()
+        return anchored(self.titles[m.group('title').lower()])
+
+    def link(self, text):
+        """
+        Returns text with titles replaced by references
+        """
+
+        if not self.rx:
+            return text
+        return self.rx.sub(self._replace, text)
+
+def make_title_references(dest, src=None, skip_source=False):
+    """
+    Finds titles in src, makes links in dest and returns it.
+    If skip_source is True, [source,...] blocks are not changed.
+    """
+
+    if not src:
+        src = dest
 
-    return dest
-                    
+    return TitleLinker(find_titles(src), skip_source).link(dest)
@@ -0,0 +1,252 @@
+# Author: David Avsajanishvili
+# Contact: avsd05@gmail.com
+
+"""
+Simple on-disk cache, storing pickled values (and optional
+data files) in files of a directory by hash of the key
+"""
+
+__all__ = ['FileCache']
+
+import os, errno, tempfile, time
+import cPickle as pickle
+
+try:
+    from hashlib import sha1
+except ImportError:
+    from sha import new as sha1
+
+class FileCache(object):
+    """
+    Stores pickled values in files of a directory, by key.
+
+    Parameters:
+
+        directory -- directory of the cache, created if not exists.
+
+        max_age -- optional age of the entries (in seconds),
+            after which they are evicted.
+
+        max_size -- optional total size of the entries (in bytes);
+            the oldest entries are evicted to fit it.
+
+        touch -- if True, age of the entry is counted from its last use,
+            otherwise - from the moment it was stored.
+
+    Besides the value, an entry may have data file, which is written
+    by chunks (see open_data) and read as file (see get_data),
+    so large data is never held in memory.
+    """
+
+    # Extension of the entries files
+    ext = '.pickle'
+
+    # Extension of data files of the entries
+    data_ext = '.data'
+
+    def __init__(self, directory, max_age=None, max_size=None, touch=True):
+        self.directory = directory
+        self.max_age = max_age
+        self.max_size = max_size
+        self.touch = touch
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def path(self, key):
+        """
+        Returns path of file of the entry
+        """
+
+        if isinstance(key, unicode):
+            key = key.encode('utf8')
+        h = sha1(key).hexdigest()
+        return os.path.join(self.directory, h[:2], h + self.ext)
+
+    def data_path(self, key):
+        """
+        Returns path of data file of the entry
+        """
+
+        return os.path.splitext(self.path(key))[0] + self.data_ext
+
+    def _makedirs(self, fn):
+        d = os.path.dirname(fn)
+        try:
+            os.makedirs(d)
+        except OSError, err:
+            if err.errno != errno.EEXIST:
+                raise
+        return d
+
+    def _replace(self, tmp, fn):
+        try:
+            os.rename(tmp, fn)
+        except OSError:
+            # Windows doesn't replace existing files
+            os.remove(fn)
+            os.rename(tmp, fn)
+
+    def _remove(self, fn):
+        try:
+            os.remove(fn)
+        except OSError:
+            pass
+
+    def get(self, key, default=None):
+        """
+        Returns value, stored by key, or default if not found or expired
+        """
+
+        fn = self.path(key)
+        try:
+            if self.max_age is not None and \
+                    os.path.getmtime(fn) < time.time() - self.max_age:
+                self.misses += 1
+                return default
+
+            f = open(fn, 'rb')
+        except (IOError, OSError):
+            self.misses += 1
+            return default
+
+        try:
+            try:
+                value = pickle.load(f)
+            finally:
+                f.close()
+        except Exception:
+            # Truncated or otherwise damaged entry
+            self._remove(fn)
+            self.misses += 1
+            return default
+
+        if self.touch:
+            try:
+                os.utime(fn, None)
+            except OSError:
+                pass
+
+        self.hits += 1
+        return value
+
+    def get_data(self, key):
+        """
+        Returns tuple of value, stored by key with data file
+        (see open_data), and the data file, open for reading,
+        or None if not found or expired
+        """
+
+        value = self.get(key)
+        if value is None:
+            return None
+
+        fn = self.data_path(key)
+        try:
+            f = open(fn, 'rb')
+        except IOError:
+            self.hits -= 1
+            self.misses += 1
+            return None
+
+        if self.touch:
+            try:
+                os.utime(fn, None)
+            except OSError:
+                pass
+
+        return value, f
+
+    def open_data(self, key):
+        """
+        Returns temporary file in the cache, open for writing data
+        of the entry. When written, it is stored with the value
+        by put, otherwise removed by discard.
+        """
+
+        d = self._makedirs(self.data_path(key))
+        fd, tmp = tempfile.mkstemp(dir=d)
+        os.close(fd)
+        return open(tmp, 'wb')
+
+    def discard(self, data):
+        """
+        Removes data file, returned by open_data
+        """
+
+        data.close()
+        self._remove(data.name)
+
+    def put(self, key, value, data=None):
+        """
+        Stores value by key with optional data file,
+        returned by open_data and written
+        """
+
+        fn = self.path(key)
+        d = self._makedirs(fn)
+
+        if data is not None:
+            data.close()
+            self._replace(data.name, self.data_path(key))
+
+        # Write to temporary file and rename it, so that
+        # other processes never see partially written entry
+        fd, tmp = tempfile.mkstemp(dir=d)
+        f = os.fdopen(fd, 'wb')
+        try:
+            pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+        finally:
+            f.close()
+        self._replace(tmp, fn)
+
+    def entries(self):
+        """
+        Returns list of (mtime, size, path) of all entries
+        and their data files, oldest first
+        """
+
+        ret = []
+        for root, dirs, files in os.walk(self.directory):
+            for fn in files:
+                if fn.endswith(self.ext) or fn.endswith(self.data_ext):
+                    fn = os.path.join(root, fn)
+                    try:
+                        st = os.stat(fn)
+                    except OSError:
+                        continue
+                    ret.append((st.st_mtime, st.st_size, fn))
+        ret.sort()
+
+        return ret
+
+    def evict(self):
+        """
+        Removes entries, older than max_age, and the oldest
+        entries, exceeding max_size. Returns number of removed entries.
+        """
+
+        if self.max_age is None and self.max_size is None:
+            return 0
+
+        entries = self.entries()
+        size = sum([e[1] for e in entries])
+        now = time.time()
+
+        n = 0
+        for mtime, sz, fn in entries:
+            if not ((self.max_age is not None and mtime < now - self.max_age) or
+                    (self.max_size is not None and size > self.max_size)):
+                break
+            try:
+                os.remove(fn)
+            except OSError:
+                continue
+            size -= sz
+            n += 1
+
+        return n
@@ -0,0 +1,238 @@
+# Author: David Avsajanishvili
+# Contact: avsd05@gmail.com
+
+"""
+Module for reading database structure directly from
+Oracle data dictionary (ALL_TABLES, ALL_TAB_COLUMNS,
+ALL_TAB_COMMENTS, ALL_COL_COMMENTS, ALL_TAB_PRIVS, ALL_VIEWS)
+into the same objects, as parsed from SQL DDL script,
+and for writing comments of the objects back
+"""
+
+__all__ = ['read_schema', 'column_type', 'write_comments']
+
+from db import Table, View, Column, Schema, parse_create
+from oracle2asciidoc import iter_batches, DEFAULT_ARRAYSIZE
+import dbapi
+from stats import NULL_STATS
+
+# Each catalog is read with single query, optionally
+# filtered by owner of the objects
+SQL_TABLES = """
+select owner, table_name
+  from all_tables %(where)s
+ order by owner, table_name"""
+
+SQL_COLUMNS = """
+select owner, table_name, column_name, data_type, data_length,
+       char_length, data_precision, data_scale, nullable, data_default
+  from all_tab_columns %(where)s
+ order by owner, table_name, column_id"""
+
+SQL_TAB_COMMENTS = """
+select owner, table_name, comments
+  from all_tab_comments %(where)s"""
+
+SQL_COL_COMMENTS = """
+select owner, table_name, column_name, comments
+  from all_col_comments %(where)s"""
+
+SQL_PRIVILEGES = """
+select table_schema, table_name, grantee, privilege
+  from all_tab_privs %(where)s
+ order by table_schema, table_name, grantee"""
+
+SQL_VIEWS = """
+select owner, view_name, text
+  from all_views %(where)s
+ order by owner, view_name"""
+
+# DDL statement, executed by executemany in Oracle PL/SQL
+# block, as DDL can't be executed with bind variables itself
+SQL_EXECUTE = "begin execute immediate :stmt; end;"
+
+# Types, which length is shown in parentheses
+LENGTH_TYPES = ('VARCHAR2', 'NVARCHAR2', 'VARCHAR', 'CHAR', 'NCHAR', 'RAW')
+
+def column_type(data_type, length=None, precision=None, scale=None):
+    """
+    Returns type of column, as written in DDL,
+    from the columns of ALL_TAB_COLUMNS
+    """
+
+    if data_type in ('NUMBER', 'FLOAT') and precision is not None:
+        if scale:
+            return "%s(%d,%d)" % (data_type, precision, scale)
+        return "%s(%d)" % (data_type, precision)
+    if data_type in LENGTH_TYPES and length:
+        return "%s(%d)" % (data_type, length)
+
+    return data_type
+
+def _iter_rows(cursor, sql, owner_column, owner, arraysize, stats):
+    """
+    Executes catalog query and yields its rows,
+    fetched by arraysize rows at once
+    """
+
+    params = {}
+    where = ""
+    if owner:
+        where = "where %s = :owner" % owner_column
+        params['owner'] = owner
+
+    with stats.stage('catalog'):
+        cursor.arraysize = arraysize
+        cursor.execute(sql % {'where': where}, params)
+    stats.count('catalog', queries=1)
+
+    batches = iter_batches(cursor, arraysize)
+    while True:
+        with stats.stage('catalog'):
+            rows = next(batches, None)
+        if rows is None:
+            break
+        stats.count('catalog', rows=len(rows))
+        for row in rows:
+            yield row
+
+def read_schema(connection, owner=None, tables=True, views=True,
+                arraysize=DEFAULT_ARRAYSIZE, stats=None):
+    """
+    Reads tables and views with their columns, comments
+    and privileges from data dictionary and returns Schema object.
+
+    Parameters:
+
+        connection -- DB-API connection (see dbapi.connect).
+
+        owner -- optional owner (schema) of the objects.
+            If specified, names of the objects are not
+            qualified with the owner.
+
+        tables, views -- switch reading of tables or views off.
+
+        arraysize -- number of rows, fetched at once.
+
+        stats -- optional stats.Stats, collecting timings
+            and counters of the "catalog" stage.
+
+    Columns of views are parsed from their scripts, as in
+    SQL DDL (see db.parse_views), and named as in the catalog.
+    Only granted privileges exist in the catalog.
+    """
+
+    stats = stats or NULL_STATS
+    if owner:
+        owner = owner.upper()
+
+    cursor = connection.cursor()
+
+    def rows(sql, owner_column='owner'):
+        return _iter_rows(cursor, sql, owner_column, owner, arraysize, stats)
+
+    def name(own, nm):
+        return nm if owner else "%s.%s" % (own, nm)
+
+    # Comments and columns by (owner, object name)
+    tab_comments = {}
+    for own, nm, comments in rows(SQL_TAB_COMMENTS):
+        tab_comments[own, nm] = comments or ''
+
+    col_comments = {}
+    for own, nm, col, comments in rows(SQL_COL_COMMENTS):
+        col_comments.setdefault((own, nm), {})[col] = comments or ''
+
+    columns = {}
+    for own, nm, col, tp, length, char_length, precision, scale, \
+            nullable, default in rows(SQL_COLUMNS):
+        comments = col_comments.get((own, nm), {})
+        columns.setdefault((own, nm), []).append(Column(
+            col,
+            column_type(tp, char_length or length, precision, scale),
+            nullable != 'N',
+            default and default.strip() or None,
+            comments.get(col, '')))
+
+    # Objects by (owner, object name)
+    objects = {}
+    schema = Schema()
+
+    if tables:
+        for own, nm in rows(SQL_TABLES):
+            t = Table(name(own, nm), tab_comments.get((own, nm), ''))
+            t.cols = columns.get((own, nm), [])
+            schema.tables.append(t)
+            objects[own, nm] = t
+
+    if views:
+        for own, nm, text in rows(SQL_VIEWS):
+            vnm = name(own, nm)
+            txt = "create or replace view %s as\n%s;" % (
+                vnm, (text or '').strip().rstrip(';'))
+            parsed = parse_create(txt)
+            if parsed and isinstance(parsed[0], View):
+                v = parsed[0]
+                v.name = vnm
+                v.desc = tab_comments.get((own, nm), '')
+            else:
+                v = View(vnm, tab_comments.get((own, nm), ''), txt)
+
+            cols = columns.get((own, nm), [])
+            if len(v.cols) == len(cols):
+                for c, cc in zip(v.cols, cols):
+                    c.name = cc.name
+                    c.desc = cc.desc
+            else:
+                # "select *" or not parsed script
+                v.cols = cols
+            schema.views.append(v)
+            objects[own, nm] = v
+
+    for own, nm, grantee, privilege in rows(SQL_PRIVILEGES, 'table_schema'):
+        obj = objects.get((own, nm))
+        if obj is not None:
+            obj.grant(grantee, privilege.upper())
+
+    cursor.close()
+    stats.count('catalog', tables=len(schema.tables), views=len(schema.views))
+
+    return schema
+
+def write_comments(connection, statements, driver=dbapi.DEFAULT_DRIVER,
+                   batch_size=DEFAULT_ARRAYSIZE, stats=None):
+    """
+    Executes COMMENT ON statements (without terminating semicolons,
+    see script_tools.comment_statement) in the database.
+
+    With Oracle driver, statements are executed in batches
+    of batch_size by single executemany call each (see SQL_EXECUTE),
+    rather than one round trip per statement; Oracle commits DDL
+    itself. With other drivers, statements are executed one
+    by one and committed at the end.
+    Returns number of executed statements.
+    Optional stats collect timings and counters of the "apply" stage.
+    """
+
+    stats = stats or NULL_STATS
+    cursor = connection.cursor()
+    n = 0
+    try:
+        if driver == 'oracle':
+            for i in xrange(0, len(statements), batch_size):
+                batch = [{'stmt': s} for s in statements[i:i + batch_size]]
+                with stats.stage('apply'):
+                    cursor.executemany(SQL_EXECUTE, batch)
+                stats.count('apply', batches=1, statements=len(batch))
+                n += len(batch)
+        else:
+            with stats.stage('apply'):
+                for s in statements:
+                    cursor.execute(s)
+                    n += 1
+                connection.commit()
+            stats.count('apply', statements=n)
+    finally:
+        cursor.close()
+
+    return n
@@ -6,44 +6,17 @@ Module for parsing database structure
 from Oracle SQL DDL script
 """
 
-__all__ = ['Table','Column','parse_tables','parse_views','PERMITS_LIST']
+__all__ = ['Table','View','Column','Schema','SchemaBuilder',
+           'parse_schema','parse_schema_stream','parse_files','parse_statement',
+           'parse_tables','parse_views','iter_objects','parse_create',
+           'PERMITS_LIST']
 
 import re
+from stats import NULL_STATS
 
 RXX_TABLENAME = \
     "(?P<tablename>([\\w\\$]+\\.|\"[\\w\\$]+\"\\.)?([\\w\\$]+|\"[\\w\\$]+\"))"
 
-RX_TABLE = re.compile(
-    r"\bCREATE\s+TABLE\s+" 
-           + RXX_TABLENAME + 
-           r"\s*\(" 
-           r"(?P<columns>.*?)" 
-           r"\)" 
-           r"\s*(;|tablespace .*?;)"
-    , re.DOTALL | re.IGNORECASE)
-
-RX_COLUMN = re.compile(
-    r'(?P<colname>([\w\$]+|"[\w\$ ]+"))\s+' 
-       r'(?P<coltype>(\w+|"[^"]+")\s*[\(\)\d]*)\s*' 
-       r"(\bdefault\s+(?P<default>\S+))?\s*" 
-       r"(?P<primarykey>\bprimary\s+key)?\s*" 
-       r"(?P<notnull>\bnot\s+null)?\s*" 
-       r"(\benable)?\s*" 
-           r"(?:\Z|,)"
-    , re.DOTALL | re.IGNORECASE)
-
-
-RX_VIEW = re.compile(
-    r"\bCREATE\s+(?:OR\s+REPLACE\s+)?VIEW\s(?P<tablename>[\w\$]*\.?[\w\$]+)\b" 
-          r"\s*(\((?P<aliases>[\s\w\$,]*)\))?" 
-          r"\s*\bAS\s+SELECT\s+" 
-          r"(?P<columns>.*?)" 
-          r"\bFROM\s+(?P<sources>.*?)(?P<isunion>\bUNION\b(\s+ALL\b)?.*?)?"
-          r"(?:(\bWHERE\b)|(\bORDER\s+BY\b)|(\bGROUP\s+BY\b)|;)"
-    , re.DOTALL | re.IGNORECASE)
-
-
-
 RX_TAB_COMMENT = re.compile(
     r"\bCOMMENT\s+ON\s+TABLE\s+" 
         + RXX_TABLENAME + 
@@ -65,36 +38,72 @@ RX_PRIVILEGE = re.compile(
         r"ON\s+" + RXX_TABLENAME + r"\s+TO\s+(?P<schema>[\w&$]+)\s*;"
     , re.DOTALL|re.IGNORECASE)
 
+def _intern(s):
+    """
+    Interns string, repeated in many objects (like column types)
+    """
+    return intern(s) if type(s) is str else s
+
 class Column(object):
 
+    __slots__ = ('name', 'type', 'nullable', 'desc', 'default', 'value', 'origin')
+
     def __init__(self, nm, tp = "", nl = False, default=None, dsc = "", value = None):
         self.name = nm.replace("\"", "")
-        self.type = tp
+        self.type = _intern(tp)
         self.nullable = nl
         self.desc = dsc
         self.default = default
         self.value = value
 
+        # Names of columns of tables, the column of view
+        # is selected from (see lineage.Lineage)
+        self.origin = None
+
+# Index of each permit in bitmask of Privileges
+PERMITS_INDEX = dict([(p, i) for i, p in enumerate(PERMITS_LIST)])
+
 class Privileges(object):
     """
-    Represents DB level privileges for certain schema
+    Represents DB level privileges for certain schema.
+
+    State of each permit - None (unset), True (granted)
+    or False (revoked) - takes two bits of a bitmask.
     """
+
+    __slots__ = ('bits',)
+
+    # Permit state by its two bits
+    STATES = (None, True, False)
+
     def __init__(self):
-        self.privileges = dict([(p,None) for p in PERMITS_LIST])
+        self.bits = 0
+
+    def _set(self, permit, state):
+        i = PERMITS_INDEX.get(permit)
+        if i is not None:
+            self.bits = self.bits & ~(3 << 2*i) | (state << 2*i)
 
     def grant(self, permit):
-        if permit in PERMITS_LIST:
-            self.privileges[permit] = True
+        self._set(permit, 1)
 
     def revoke(self, permit):
-        if permit in PERMITS_LIST:
-            self.privileges[permit] = False
+        self._set(permit, 2)
 
     def __getitem__(self,index):
-        return self.privileges[index]
+        return self.STATES[(self.bits >> 2*PERMITS_INDEX[index]) & 3]
+
+    @property
+    def privileges(self):
+        """
+        Dictionary of states by permits
+        """
+        return dict([(p, self[p]) for p in PERMITS_LIST])
 
 class TableView(object):
 
+    __slots__ = ('name', 'desc', 'text', 'cols', 'permits')
+
     _obj_type = ""
 
     def __init__(self, nm, dsc = "", txt = ""):
@@ -152,7 +161,7 @@ class TableView(object):
                 Must accept single argument - Column object.
         """
 
-        ret = ""
+        ret = []
 
         # If only one column - '*', not render:
         if len(self.cols) == 1 and self.cols[0].name == '*':
@@ -168,28 +177,36 @@ class TableView(object):
                     'value'     : c.value,
                     'desc'      : c.desc,
                 }
-            ret += pattern % dct
+            ret.append(pattern % dct)
             
-        return ret
+        return "".join(ret)
             
     def parse_privileges(self,sql):
         """
         Parses privileges and revokes for the object from passed SQL
         """
 
-        for g in RX_PRIVILEGE.finditer(sql):
-            dt = g.groupdict()
-            if dt['tablename'].replace("\"", "").lower() == self.name.lower():
-                if dt['privilege'].lower() == 'revoke':
-                    self.revoke(dt['schema'],dt['permit'])
-                else:
-                    self.grant(dt['schema'],dt['permit'])
+        self.apply_privileges(parse_grants(sql))
+
+    def apply_privileges(self, grants):
+        """
+        Applies privileges and revokes for the object
+        from dictionary, returned by parse_grants
+        """
+
+        for privilege, schema, permit in grants.get(normalize_name(self.name), ()):
+            if privilege == 'revoke':
+                self.revoke(schema, permit)
+            else:
+                self.grant(schema, permit)
 
 
 class Table(TableView):
+    __slots__ = ()
     _obj_type = "Table"
 
 class View(TableView):
+    __slots__ = ('sources', 'is_union')
     _obj_type = "View"
 
     def __init__(self, nm, dsc = "", txt = ""):
@@ -197,38 +214,151 @@ class View(TableView):
         self.sources = []
         self.is_union = False
 
+# Opening delimiters of SQL lexemes, which may hide or contain comments
+RX_LEXEME_START = re.compile(r"['\"]|/\*|--")
+
+# Closing delimiter, searched for each opened lexeme
+LEXEME_END = {"'": "'", '"': '"', '/*': '*/', '--': '\n'}
+
+def iter_strip_sql_comments(source, chunk_size=65536):
+    """
+    Removes inline and block comments of SQL (/*...*/, --...)
+    in a single pass and yields cleaned text incrementally.
+
+    Parameters:
+
+        source -- SQL text, file-like object (having "read" method)
+            or iterable of text chunks.
+
+        chunk_size -- size of chunks read from file-like source.
+
+    String literals ('...') and quoted identifiers ("...") are
+    passed through untouched. Line comments are replaced with
+    the line break terminating them.
+    """
+
+    if hasattr(source, 'read'):
+        source = iter(lambda read=source.read: read(chunk_size), '')
+    elif isinstance(source, basestring):
+        source = [source]
+
+    end = None  # Closing delimiter of the current lexeme
+    tail = ''   # Text kept until the next chunk
+
+    for chunk in source:
+        buf = tail + chunk
+        tail = ''
+        ret = []
+        pos = 0
+        n = len(buf)
+
+        while pos < n:
+            if end is None:
+                m = RX_LEXEME_START.search(buf, pos)
+                if not m:
+                    # Trailing "/" or "-" may start a comment in the next chunk
+                    i = n - 1 if buf[-1] in '/-' else n
+                    ret.append(buf[pos:i])
+                    tail = buf[i:]
+                    break
+                ret.append(buf[pos:m.start()])
+                lx = m.group()
+                end = LEXEME_END[lx]
+                if end == lx:
+                    # Quote - is a part of output
+                    ret.append(lx)
+                pos = m.end()
+            else:
+                i = buf.find(end, pos)
+                if i < 0:
+                    if end in '\'"':
+                        ret.append(buf[pos:])
+                    elif end == '*/' and buf[-1] == '*':
+                        # Closing "*/" may be split between chunks
+                        tail = '*'
+                    break
+                if end in '\'"':
+                    ret.append(buf[pos:i + 1])
+                elif end == '\n':
+                    # Line break, terminating the line comment
+                    ret.append(end)
+                pos = i + len(end)
+                end = None
+
+        if ret:
+            yield ''.join(ret)
+
+    if tail and end is None:
+        yield tail
+
 def remove_sql_comments(sql):
     """
     Removes inline and block comments of SQL (/*...*/, --...)
     """
 
-    fnd =re.compile(r"(\/\*.*?\*\/)", re.DOTALL)
-    while fnd.search(sql):
-        sql = fnd.sub("", sql)
+    return ''.join(iter_strip_sql_comments(sql))
 
-    is_str = False
-    is_cmt = False
-    sql2 = ""
-    i = 0
-    while i < len(sql):
-        if is_cmt:
-            if sql[i]=="\n":
-                is_cmt = False
-                sql2 += sql[i]
-        else:
-            if is_str:
-                sql2 += sql[i]
+# Characters, which may open quoted text or terminate statement
+RX_STATEMENT_DELIM = re.compile(r"['\";]")
+
+def iter_statements(source, chunk_size=65536):
+    """
+    Splits SQL to statements as it is read and yields them
+    one by one (with terminating semicolon), without comments.
+
+    Parameters are the same as of iter_strip_sql_comments.
+    Semicolons inside quoted strings and identifiers
+    don't terminate statements. Only current statement
+    is held in memory.
+    """
+
+    quote = None
+    parts = []
+
+    for chunk in iter_strip_sql_comments(source, chunk_size):
+        start = pos = 0
+        while True:
+            if quote:
+                i = chunk.find(quote, pos)
+                if i < 0:
+                    break
+                pos = i + 1
+                quote = None
             else:
-                if sql[i:i+2] == '--':
-                    is_cmt = True
+                m = RX_STATEMENT_DELIM.search(chunk, pos)
+                if not m:
+                    break
+                pos = m.end()
+                if m.group() == ';':
+                    parts.append(chunk[start:pos])
+                    yield ''.join(parts)
+                    parts = []
+                    start = pos
                 else:
-                    sql2 += sql[i]
-            if sql[i]=="'":
-                is_str = not is_str
-        i+=1
-    sql = sql2
-    
-    return sql
+                    quote = m.group()
+        parts.append(chunk[start:])
+
+    stmt = ''.join(parts)
+    if stmt.strip():
+        yield stmt
+
+# Statement with comments: runs of plain text, string literals,
+# quoted identifiers and comments (unterminated ones run to the end),
+# up to terminating semicolon. Alternatives start with different
+# characters, and the expression always matches, so it never backtracks.
+RX_RAW_STATEMENT = re.compile(
+    r"(?:[^'\"/;-]+|'[^']*'?|\"[^\"]*\"?|/\*(?:[^*]+|\*+(?!/))*(?:\*/)?"
+    r"|--[^\n]*|[/-])*;?")
+
+def split_statements(sql):
+    """
+    Splits SQL text to statements the same way as iter_statements,
+    but keeps their comments and whitespace, so that the statements
+    join back to the text. Statements are split in a single pass
+    of regular expression, faster than iter_statements.
+    """
+
+    return [s for s in RX_RAW_STATEMENT.findall(sql) if s]
 
 def parse_table_comments(sql):
     """
@@ -242,6 +372,29 @@ def parse_table_comments(sql):
 
     return tabcoms
 
+def normalize_name(nm):
+    """
+    Returns name of the object, normalized for lookups
+    (without quotes and lowercase)
+    """
+
+    return nm.replace("\"", "").lower()
+
+def parse_grants(sql):
+    """
+    Parses GRANT and REVOKE statements and returns as Dictionary
+    (by normalized, schema-qualified object name) of Lists
+    of (privilege, schema, permit) in order of appearance
+    """
+
+    grants = {}
+    for g in RX_PRIVILEGE.finditer(sql):
+        dt = g.groupdict()
+        grants.setdefault(normalize_name(dt['tablename']), []).append(
+            (dt['privilege'].lower(), dt['schema'], dt['permit']))
+
+    return grants
+
 def parse_column_comments(sql):
     """
     Parses comments for COLUMNS and returns as Dictionary
@@ -259,47 +412,387 @@ def parse_column_comments(sql):
     return colcoms
 
 
+class Schema(object):
+    """
+    Represents database structure, parsed from SQL DDL script:
+    tables, views, comments and privileges of the objects.
+    """
+
+    def __init__(self, tables=None, views=None,
+                 tab_comments=None, col_comments=None, grants=None):
+        self.tables = tables or []
+        self.views = views or []
+        self.tab_comments = tab_comments or {}
+        self.col_comments = col_comments or {}
+        self.grants = grants or {}
+
+    def objects(self):
+        """
+        Returns list of all objects - tables followed by views
+        """
+        return self.tables + self.views
+
+
+# Version of the parser, part of keys of cached objects.
+# Must be changed whenever parsing of objects changes.
+PARSER_VERSION = 4
+
+RX_STATEMENT_KIND = re.compile(
+    r"\s*(?P<kind>CREATE|COMMENT|GRANT|REVOKE)\b", re.IGNORECASE)
+
+def statement_key(stmt):
+    """
+    Returns key of object, parsed from CREATE statement, in cache
+    """
+
+    return "%s\n%s" % (PARSER_VERSION, stmt.strip())
+
+
+def parse_statement(stmt, cache=None):
+    """
+    Parses single statement without SQL comments and returns
+    tuple of its kind and parsed data, or None for statements
+    of other kinds:
+
+        ('create', (object, name)) -- CREATE TABLE or VIEW:
+            Table or View and its name, as written in statement.
+
+        ('tab_comment', (name, comment)) -- COMMENT ON TABLE.
+
+        ('col_comment', (name, column, comment)) -- COMMENT ON COLUMN.
+
+        ('privilege', (name, (privilege, schema, permit)))
+            -- GRANT or REVOKE with normalized name of object.
+
+    Optional cache keeps objects, parsed from CREATE statements
+    (see SchemaBuilder).
+    """
+
+    m = RX_STATEMENT_KIND.match(stmt)
+    if not m:
+        return None
+
+    kind = m.group('kind').upper()
+    pos = m.start('kind')
+
+    if kind == 'CREATE':
+        if cache is None:
+            parsed = parse_create(stmt, pos)
+        else:
+            key = statement_key(stmt)
+            parsed = cache.get(key)
+            if parsed is None:
+                parsed = parse_create(stmt, pos)
+                cache.put(key, parsed)
+
+        if parsed:
+            return 'create', parsed
+
+    elif kind == 'COMMENT':
+        t = RX_TAB_COMMENT.match(stmt, pos)
+        if t:
+            return 'tab_comment', (t.group('tablename'),
+                                   t.group('comment').replace("''", "'"))
+        t = RX_COL_COMMENT.match(stmt, pos)
+        if t:
+            return 'col_comment', (t.group('tablename'), t.group('colname'),
+                                   t.group('comment').replace("''", "'"))
+
+    else:
+        t = RX_PRIVILEGE.match(stmt, pos)
+        if t:
+            return 'privilege', (normalize_name(t.group('tablename')),
+                                 (t.group('privilege').lower(), t.group('schema'),
+                                  t.group('permit')))
+
+    return None
+
+
+class SchemaBuilder(object):
+    """
+    Builds Schema from SQL statements, fed one by one.
+
+    Usage:
+
+        builder = SchemaBuilder()
+        for stmt in iter_statements(f):
+            builder.feed(stmt)
+        schema = builder.finish()
+
+    Whole scripts may be parsed with "parse" method as well,
+    and builders of several scripts may be merged together.
+    Comments and privileges may follow the objects
+    in the script, so they are applied in "finish".
+
+    Optional cache (see cache.FileCache) keeps objects, parsed
+    from CREATE statements, by their text. Unchanged statements
+    are not parsed again when fed to builder with the same cache.
+
+    Optional stats (see stats.Stats) collect timings and counters
+    of the parsing stages of "parse" and "finish".
+    """
+
+    def __init__(self, cache=None, stats=None):
+        self.schema = Schema()
+        self.cache = cache
+        self.stats = stats or NULL_STATS
+
+        # Parsed objects with their names, as written in CREATE statement
+        self._objects = []
+
+    def feed(self, stmt):
+        """
+        Parses single statement without SQL comments, dispatching
+        it by its kind (see parse_statement) and applies it.
+        Returns created Table or View object, if any.
+        """
+
+        return self.apply(parse_statement(stmt, self.cache))
+
+    def apply(self, parsed):
+        """
+        Applies statement, parsed with parse_statement.
+        Returns created Table or View object, if any.
+        """
+
+        if parsed is None:
+            return None
+
+        kind, data = parsed
+        schema = self.schema
+
+        if kind == 'create':
+            obj, nm = data
+            return self._add(obj, nm,
+                             schema.views if isinstance(obj, View) else schema.tables)
+        elif kind == 'tab_comment':
+            nm, comment = data
+            schema.tab_comments[nm] = comment
+        elif kind == 'col_comment':
+            nm, colname, comment = data
+            schema.col_comments.setdefault(nm, {})[colname] = comment
+        else:
+            nm, grant = data
+            schema.grants.setdefault(nm, []).append(grant)
+
+        return None
+
+    def parse(self, sql, tables=True, views=True):
+        """
+        Parses whole SQL script (see parse_schema)
+        and returns the builder itself
+        """
+
+        schema = self.schema
+        stats = self.stats
+
+        with stats.stage('strip'):
+            size = len(sql)
+            sql = remove_sql_comments(sql)
+        stats.count('strip', bytes_in=size, bytes_out=len(sql))
+
+        with stats.stage('comments'):
+            tab_comments = parse_table_comments(sql)
+            col_comments = parse_column_comments(sql)
+        stats.count('comments', tables=len(tab_comments),
+                    columns=sum([len(v) for v in col_comments.itervalues()]))
+
+        with stats.stage('privileges'):
+            grants = parse_grants(sql)
+        stats.count('privileges', objects=len(grants),
+                    statements=sum([len(v) for v in grants.itervalues()]))
+
+        self._update(tab_comments, col_comments, grants)
+
+        if tables:
+            with stats.stage('tables'):
+                n = len(schema.tables)
+                for obj, nm in _iter_creates(sql, 'TABLE'):
+                    self._add(obj, nm, schema.tables)
+            stats.count('tables', tables=len(schema.tables) - n,
+                        columns=sum([len(t.cols) for t in schema.tables[n:]]))
+        if views:
+            with stats.stage('views'):
+                n = len(schema.views)
+                for obj, nm in _iter_creates(sql, 'VIEW'):
+                    self._add(obj, nm, schema.views)
+            stats.count('views', views=len(schema.views) - n,
+                        columns=sum([len(t.cols) for t in schema.views[n:]]))
+
+        return self
+
+    def merge(self, other):
+        """
+        Appends objects, comments and privileges, parsed
+        by other (not finished) builder, as if its script
+        followed the script of this one
+        """
+
+        schema = self.schema
+        schema.tables.extend(other.schema.tables)
+        schema.views.extend(other.schema.views)
+        self._objects.extend(other._objects)
+        self._update(other.schema.tab_comments, other.schema.col_comments,
+                     other.schema.grants)
+
+        return self
+
+    def _update(self, tab_comments, col_comments, grants):
+        schema = self.schema
+        schema.tab_comments.update(tab_comments)
+        for k, v in col_comments.iteritems():
+            schema.col_comments.setdefault(k, {}).update(v)
+        for k, v in grants.iteritems():
+            schema.grants.setdefault(k, []).extend(v)
+
+    def _add(self, obj, nm, lst):
+        lst.append(obj)
+        self._objects.append((obj, nm))
+        return obj
+
+    def finish(self):
+        """
+        Applies comments and privileges to parsed objects
+        and returns Schema
+        """
+
+        schema = self.schema
+        with self.stats.stage('finish'):
+            for obj, nm in self._objects:
+                _apply_comments(obj, nm, schema.tab_comments, schema.col_comments)
+                obj.apply_privileges(schema.grants)
+        self.stats.count('finish', objects=len(self._objects))
+        self._objects = []
+
+        return schema
+
+
+def parse_schema(sql, tables=True, views=True, stats=None):
+    """
+    Parses Oracle-formatted SQL file and returns Schema object.
+
+    Comments are removed and COMMENT ON, GRANT and REVOKE
+    statements are parsed only once for both tables and views.
+    Parsing of tables or views may be switched off with
+    the "tables" and "views" parameters.
+    Optional stats are passed to SchemaBuilder.
+    """
+
+    return SchemaBuilder(stats=stats).parse(sql, tables, views).finish()
+
+
+def parse_schema_stream(source, chunk_size=65536, cache=None, stats=None):
+    """
+    Parses SQL statement by statement, as it is read from source
+    (see iter_strip_sql_comments), and returns Schema object.
+    Memory, used for parsing, depends on the largest statement
+    rather than on the size of the script.
+    Optional cache and stats are passed to SchemaBuilder;
+    as reading, stripping and parsing are interleaved,
+    they are counted as the single "parse" stage.
+    """
+
+    builder = SchemaBuilder(cache, stats)
+    stats = builder.stats
+    n = 0
+    with stats.stage('parse'):
+        for stmt in iter_statements(source, chunk_size):
+            builder.feed(stmt)
+            n += 1
+    schema = builder.schema
+    stats.count('parse', statements=n, tables=len(schema.tables),
+                views=len(schema.views))
+
+    return builder.finish()
+
+
+def _parse_file(args):
+    """
+    Parses SQL file (in worker process) and returns tuple
+    of not finished SchemaBuilder, hits and misses of the cache
+    """
+
+    filename, stream, tables, views, cache_args = args
+
+    cache = None
+    if cache_args:
+        from cache import FileCache
+        directory, max_age, touch = cache_args
+        cache = FileCache(directory, max_age=max_age, touch=touch)
+
+    builder = SchemaBuilder(cache)
+    f = open(filename)
+    try:
+        if stream or cache:
+            for stmt in iter_statements(f):
+                builder.feed(stmt)
+        else:
+            builder.parse(f.read(), tables, views)
+    finally:
+        f.close()
+
+    if cache is None:
+        return builder, 0, 0
+    return builder, cache.hits, cache.misses
+
+
+def parse_files(filenames, jobs=1, merge=True, stream=False,
+                tables=True, views=True, cache=None):
+    """
+    Parses SQL files in a pool of "jobs" processes.
+
+    If merge is True, returns single Schema object, as if
+    the files were concatenated in the given order (so comments
+    and privileges may be in other files than the objects).
+    Otherwise returns list of Schema objects, one per file.
+    The result doesn't depend on scheduling of the processes.
+
+    Other parameters are the same as of parse_schema;
+    stream=True parses files with parse_schema_stream.
+    If cache (see cache.FileCache) is specified, files are parsed
+    statement by statement, with objects cached in its directory
+    (see SchemaBuilder); hits and misses of the processes are
+    added to the cache statistics.
+    """
+
+    cache_args = cache and (cache.directory, cache.max_age, cache.touch)
+    args = [(fn, stream, tables, views, cache_args) for fn in filenames]
+
+    if jobs > 1 and len(args) > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(min(jobs, len(args)))
+        try:
+            results = pool.map(_parse_file, args)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = map(_parse_file, args)
+
+    builders = []
+    for b, hits, misses in results:
+        builders.append(b)
+        if cache is not None:
+            cache.hits += hits
+            cache.misses += misses
+
+    if not merge:
+        return [b.finish() for b in builders]
+
+    builder = SchemaBuilder()
+    for b in builders:
+        builder.merge(b)
+
+    return builder.finish()
+
+
 def parse_tables(sql):
     """
     Parses Oracle-formatted SQL file, extracts tables
     and returns them as List
     """
 
-    sql = remove_sql_comments(sql)
-
-    # Parse comments
-    tab_comments = parse_table_comments(sql)
-    col_comments = parse_column_comments(sql)
-
-    # Parse tables
-    tables = []
-    for t in RX_TABLE.finditer(sql):
-        dt = t.groupdict()
-
-        # Create table object
-        tabl = Table(dt['tablename'], tab_comments.get(dt['tablename'], ''), t.group())
-        tabl_colcomments = col_comments.get(tabl.name, {})
-
-        # Parse columns of the table
-        for t2 in RX_COLUMN.finditer(dt['columns']):
-            dc = t2.groupdict()
-
-            # Add column
-            tabl.add_column(
-                dc['colname'],
-                dc['coltype'],
-                False if str(dc['notnull']).upper()=="NOT NULL" else True,
-                dc['default'],
-                tabl_colcomments.get(dc['colname'], ""))
-            #print dc['colname']
-
-        # Parse privileges of the table
-        tabl.parse_privileges(sql)
-            
-        # Add table to Dictionary
-        tables.append(tabl)
-
-    return tables
+    return parse_schema(sql, views=False).tables
 
 
 def parse_views(sql):
@@ -308,98 +801,626 @@ def parse_views(sql):
     and returns them as a list.
     """
 
-    sql = remove_sql_comments(sql)
+    return parse_schema(sql, tables=False).views
 
-    # Parse comments
-    tab_comments = parse_table_comments(sql)
-    col_comments = parse_column_comments(sql)
-
-    # Parse views
-    views = []
-    for t in RX_VIEW.finditer(sql):
-        dt = t.groupdict()
-
-        # Create View object
-        view = View(dt['tablename'], tab_comments.get(dt['tablename'], ''), t.group())
-        view_colcomments = col_comments.get(view.name, {})
-        view.is_union = bool(dt.get('isunion'))
-
-
-        # ---------------------
-        # Adding Columns
-        # ---------------------
-        col_vl = "" #Value
-        col_al = "" #Alias
-        bFillingAlias = False
-
-        def add_col_to_view(view, col_al, col_vl, colcomments_dict):
-            """
-            Adds a column to View
-            """
-            col_al = (col_al.strip() or col_vl).split(".")[-1].strip()
-            cc = Column(
-                nm    = col_al,
-                value = col_vl.strip())
-            cc.desc = colcomments_dict.get(cc.name)
-
-            cc = view.add_col(col=cc)
-            #-------------------------
-
-        parth = 0
-        is_str = False
-
-        for c in dt['columns']:
-            if not (parth>0 or is_str):
-                if c == ",":
-                    add_col_to_view(view, col_al, col_vl, view_colcomments)
-
-                    col_vl = ""
-                    col_al = ""
-                    bFillingAlias = False
+
+def parse_create(stmt, pos=0):
+    """
+    Parses CREATE TABLE or CREATE VIEW statement, starting at pos.
+    Returns tuple of created object and its name, as written
+    in the statement, or empty tuple.
+    """
+
+    obj, nm, end = _scan_create(stmt, pos)
+    if obj is None:
+        return ()
+
+    return obj, nm
+
+
+def _apply_comments(obj, nm, tab_comments, col_comments):
+    """
+    Sets descriptions of the object and its columns.
+    nm is the name of the object, as written in CREATE statement.
+    """
+
+    obj.desc = tab_comments.get(nm, '')
+    colcomments = col_comments.get(obj.name, {})
+    for c in obj.cols:
+        c.desc = colcomments.get(c.name, c.desc)
+
+
+# Lexemes of SQL: string literals, quoted identifiers, words (keywords,
+# names and numbers) and single characters, preceded by whitespace and
+# comments. Alternatives don't overlap, and unterminated comments and
+# quotes run to the end of SQL, so scanning never backtracks and takes
+# linear time. At the end of SQL only whitespace is matched.
+RX_TOKEN = re.compile(
+    r"(?:\s|--[^\n]*|/\*[^*]*(?:\*+[^*/][^*]*)*(?:\*+/|\**\Z))*"
+    r"(?:(?P<string>'[^']*(?:''[^']*)*'?)"
+    r"|(?P<quoted>\"[^\"]*\"?)"
+    r"|(?P<word>[\w\$#]+)"
+    r"|(?P<char>.)"
+    r"|\Z)"
+    , re.DOTALL)
+
+# CREATE keyword or quoted literal, which is skipped. Each alternative
+# starts with a character of a set, so the search skips other ones fast.
+RX_CREATE = re.compile(
+    r"'[^']*'?|\"[^\"]*\"?"
+    r"|([Cc][Rr][Ee][Aa][Tt][Ee])(?<![\w\$#]......)(?![\w\$#])")
+
+# Words between CREATE and TABLE or VIEW
+CREATE_MODIFIERS = frozenset(['OR', 'REPLACE', 'FORCE', 'NO', 'EDITIONABLE',
+                              'NONEDITIONABLE', 'GLOBAL', 'TEMPORARY'])
+
+# Words of multi-word column types, following the first one
+TYPE_WORDS = frozenset(['WITH', 'LOCAL', 'TIME', 'ZONE', 'TO', 'YEAR', 'MONTH',
+                        'DAY', 'SECOND', 'PRECISION', 'RAW', 'VARYING'])
+
+# Words, starting constraints in the list of columns of table
+TABLE_CONSTRAINTS = frozenset(['CONSTRAINT', 'PRIMARY', 'FOREIGN', 'UNIQUE',
+                               'CHECK', 'SUPPLEMENTAL'])
+
+# Words, terminating default value of column
+COLUMN_CONSTRAINTS = frozenset(['CONSTRAINT', 'NOT', 'NULL', 'PRIMARY', 'UNIQUE',
+                                'CHECK', 'REFERENCES', 'ENABLE', 'DISABLE'])
+
+# Words, terminating list of sources of view
+SOURCES_END = frozenset(['WHERE', 'GROUP', 'ORDER', 'HAVING', 'CONNECT', 'START',
+                         'UNION', 'INTERSECT', 'MINUS', 'WITH'])
+
+# Kinds of tokens, which may be names
+NAME_KINDS = ('word', 'quoted')
+
+
+def _iter_tokens(sql, pos=0):
+    """
+    Yields tokens of SQL, starting at pos, without whitespace
+    and comments: tuples of kind (see RX_TOKEN), text (upper-cased
+    for words), start and end. At the end of SQL yields tokens
+    of None kind forever.
+    """
+
+    for m in RX_TOKEN.finditer(sql, pos):
+        kind = m.lastgroup
+        if kind is None:
+            break
+        text = m.group(kind)
+        if kind == 'word':
+            text = text.upper()
+        yield kind, text, m.start(kind), m.end()
+
+    n = len(sql)
+    while True:
+        yield None, '', n, n
+
+
+class _Tokens(object):
+    """
+    Stream of tokens of SQL (see _iter_tokens) with the current one.
+
+    Parentheses may be collapsed to single "group" tokens, so each
+    token is read once and parsing takes linear time.
+    """
+
+    __slots__ = ('sql', 'tok', '_it')
+
+    def __init__(self, sql, pos=0):
+        self.sql = sql
+        self._it = _iter_tokens(sql, pos)
+        self.tok = next(self._it)
+
+    def next(self):
+        """
+        Moves to the next token
+        """
+
+        self.tok = next(self._it)
+
+    def word(self):
+        """
+        Returns text of current token, if it's a word
+        """
+
+        kind, text, start, end = self.tok
+        return text if kind == 'word' else None
+
+    def at_end(self):
+        """
+        Tells whether current token terminates statement
+        """
+
+        return self.tok[0] is None or self.tok[1] == ';'
+
+    def name(self):
+        """
+        Reads (optionally qualified) name and returns
+        its text or None
+        """
+
+        kind, text, start, end = self.tok
+        if kind not in NAME_KINDS:
+            return None
+        self.next()
+        if self.tok[1] == '.':
+            self.next()
+            if self.tok[0] not in NAME_KINDS:
+                return None
+            end = self.tok[3]
+            self.next()
+
+        return self.sql[start:end]
+
+    def group(self):
+        """
+        Reads tokens from opening parenthesis to the matching
+        closing one and returns them as single "group" token,
+        or None, if statement ends before it
+        """
+
+        it = self._it
+        tok = self.tok
+        start = tok[2]
+        depth = 0
+        while tok[0] is not None:
+            if tok[0] == 'char':
+                text = tok[1]
+                if text == '(':
+                    depth += 1
+                elif text == ')':
+                    depth -= 1
+                    if not depth:
+                        self.tok = next(it)
+                        return ('group', '', start, tok[3])
+                elif text == ';':
+                    break
+            tok = next(it)
+
+        self.tok = tok
+        return None
+
+    def items(self, stops=()):
+        """
+        Reads comma-separated items up to one of the stop words,
+        closing parenthesis or the end of statement, and returns
+        them as lists of tokens (parentheses collapsed to groups)
+        """
+
+        it = self._it
+        tok = self.tok
+        items = []
+        item = []
+        while True:
+            kind = tok[0]
+            if kind == 'char':
+                text = tok[1]
+                if text == '(':
+                    self.tok = tok
+                    tok = self.group()
+                    if tok is None:
+                        break
+                    item.append(tok)
+                    tok = self.tok
                     continue
+                if text == ',':
+                    items.append(item)
+                    item = []
+                    tok = next(it)
+                    continue
+                if text == ')' or text == ';':
+                    break
+            elif kind == 'word':
+                if tok[1] in stops:
+                    break
+            elif kind is None:
+                break
+            item.append(tok)
+            tok = next(it)
+
+        self.tok = tok
+        items.append(item)
+        return [i for i in items if i]
+
+    def skip(self):
+        """
+        Skips tokens to the end of statement and returns
+        position after the terminating semicolon
+        """
 
-                # If some space found
-                elif c in " \n" and bool(col_vl.strip()):
-                    bFillingAlias = True
+        while not self.at_end():
+            self.next()
 
-            if c == "'":
-                is_str = not is_str
+        return self.tok[3]
 
-            if not is_str:
-                if c == '(':
-                    parth+=1
-                elif c == ')':
-                    parth-=1
 
-            if bFillingAlias:
-                col_al +=c
-            else:
-                col_vl +=c
-
-        # Add the final column
-        add_col_to_view(view, col_al, col_vl, view_colcomments)
-
-        # Optional column aliases before the AS keyword
-        aliases = dt.get('aliases')
-        if aliases:
-            aliases = aliases.split(",")
-            if len(aliases)==len(view.cols):
-                for i in range(len(aliases)):
-                    view.cols[i].name = aliases[i].strip()
-                    view.cols[i].desc = view_colcomments.get(view.cols[i].name)
-        
-        # ---------------------
-        # Adding View-Sources
-        # ---------------------
-        if dt['sources'].strip():
-            view.sources = dt['sources'].split(",")
-            for i in range(0,len(view.sources)):
-                view.sources[i] = view.sources[i].strip()
-
-        # Parse privileges of the view
-        view.parse_privileges(sql)
-        
-        # Add view to Dictionary
-        views.append(view)
+def _text(sql, tokens):
+    """
+    Returns text of SQL from the first token to the last one
+    """
+
+    return sql[tokens[0][2]:tokens[-1][3]]
+
+
+def _scan_create(sql, pos=0, kind=None):
+    """
+    Parses CREATE TABLE or CREATE VIEW statement, starting at pos.
+    If kind ('TABLE' or 'VIEW') is specified, statements of other
+    kind are not parsed.
+
+    Returns tuple of created object (None, if the statement
+    is not parsed), its name, as written in the statement,
+    and position, where parsing stopped.
+    """
+
+    toks = _Tokens(sql, pos)
+    start = toks.tok[2]
+
+    if toks.word() != 'CREATE':
+        return None, None, toks.tok[2]
+    toks.next()
+    while toks.word() in CREATE_MODIFIERS:
+        toks.next()
+
+    obj_kind = toks.word()
+    if obj_kind not in ('TABLE', 'VIEW') or kind and obj_kind != kind:
+        return None, None, toks.tok[2]
+    toks.next()
+
+    nm = toks.name()
+    if nm is None:
+        return None, None, toks.tok[2]
+
+    if obj_kind == 'TABLE':
+        obj = _parse_table(toks, nm, start)
+    else:
+        obj = _parse_view(toks, nm, start)
+
+    if obj is None:
+        return None, None, toks.tok[2]
+
+    return obj, nm, toks.tok[3]
+
+
+def _parse_table(toks, nm, start):
+    """
+    Parses the rest of CREATE TABLE statement after the name
+    of the table and returns Table object or None
+    """
+
+    sql = toks.sql
+    if toks.tok[1] != '(':
+        return None
+    toks.next()
+    items = toks.items()
+    if toks.tok[1] != ')':
+        return None
+    toks.next()
+
+    tabl = Table(nm, '', sql[start:toks.skip()])
+    for tokens in items:
+        _add_table_column(tabl, sql, tokens)
+
+    return tabl
+
+
+def _add_table_column(tabl, sql, tokens):
+    """
+    Adds column to the table from tokens of its definition
+    (name, type, default and constraints), unless they
+    define constraint of the table
+    """
+
+    n = len(tokens)
+    if n < 2 or tokens[0][0] not in NAME_KINDS or tokens[1][0] not in NAME_KINDS:
+        return
+    if tokens[0][0] == 'word' and tokens[0][1] in TABLE_CONSTRAINTS:
+        return
+
+    # Type with size and further words, like "timestamp(6) with time zone"
+    i = 2
+    while i < n and (tokens[i][0] == 'group' or
+                     tokens[i][0] == 'word' and tokens[i][1] in TYPE_WORDS):
+        i += 1
+    tp = _text(sql, tokens[1:i])
+
+    default = None
+    nullable = True
+    while i < n:
+        kind, text = tokens[i][:2]
+        if kind != 'word':
+            i += 1
+        elif text == 'DEFAULT' and i + 1 < n:
+            j = i + 2
+            while j < n and not (tokens[j][0] == 'word' and
+                                 tokens[j][1] in COLUMN_CONSTRAINTS):
+                j += 1
+            default = _text(sql, tokens[i+1:j])
+            i = j
+        elif text == 'NOT' and i + 1 < n and tokens[i+1][1] == 'NULL':
+            nullable = False
+            i += 2
+        else:
+            i += 1
+
+    tabl.add_column(sql[tokens[0][2]:tokens[0][3]], tp, nullable, default)
+
+
+def _parse_view(toks, nm, start):
+    """
+    Parses the rest of CREATE VIEW statement after the name
+    of the view and returns View object or None
+    """
+
+    sql = toks.sql
+
+    # Optional column aliases before the AS keyword
+    aliases = None
+    if toks.tok[1] == '(':
+        toks.next()
+        aliases = toks.items()
+        if toks.tok[1] != ')':
+            return None
+        toks.next()
+
+    if toks.word() != 'AS':
+        return None
+    toks.next()
+    if toks.word() != 'SELECT':
+        return None
+    toks.next()
+    if toks.word() in ('DISTINCT', 'UNIQUE', 'ALL'):
+        toks.next()
+
+    columns = toks.items(('FROM',))
+    if toks.word() != 'FROM':
+        return None
+    toks.next()
+    sources = toks.items(SOURCES_END)
+
+    # UNION of the outer select
+    is_union = False
+    while not toks.at_end():
+        if toks.tok[1] == '(':
+            if toks.group() is None:
+                break
+            continue
+        if toks.word() == 'UNION':
+            is_union = True
+        toks.next()
+
+    view = View(nm, '', sql[start:toks.skip()])
+    view.is_union = is_union
+
+    for tokens in columns:
+        _add_view_column(view, sql, tokens)
+
+    if aliases and len(aliases) == len(view.cols):
+        for c, tokens in zip(view.cols, aliases):
+            c.name = _text(sql, tokens).replace("\"", "")
+
+    view.sources = [_text(sql, tokens) for tokens in sources]
+
+    return view
+
+
+def _add_view_column(view, sql, tokens):
+    """
+    Adds column to the view from tokens of expression
+    of the select list with optional alias
+    """
+
+    n = len(tokens)
+    value = tokens
+    alias = None
+    if n > 1 and tokens[-1][0] in NAME_KINDS and tokens[-1][1] not in ('END', 'NULL'):
+        if tokens[-2][0] == 'word' and tokens[-2][1] == 'AS':
+            if n > 2:
+                value, alias = tokens[:-2], tokens[-1:]
+        elif tokens[-2][0] in ('word', 'quoted', 'string', 'group'):
+            value, alias = tokens[:-1], tokens[-1:]
+
+    if alias is None:
+        # The last part of qualified name of column or whole expression
+        alias = value[-1:]
+        for kind, text, start, end in value:
+            if kind not in NAME_KINDS and text not in ('.', '*'):
+                alias = value
+                break
+
+    view.add_col(Column(
+        nm    = _text(sql, alias),
+        dsc   = None,
+        value = _text(sql, value)))
+
+
+class _LazyContext(object):
+    """
+    Column comments and privileges of SQL script without comments,
+    parsed on first use by lazy objects (see iter_objects)
+    """
+
+    __slots__ = ('sql', '_col_comments', '_grants')
+
+    def __init__(self, sql):
+        self.sql = sql
+        self._col_comments = None
+        self._grants = None
+
+    def col_comments(self):
+        if self._col_comments is None:
+            self._col_comments = parse_column_comments(self.sql)
+        return self._col_comments
+
+    def grants(self):
+        if self._grants is None:
+            self._grants = parse_grants(self.sql)
+        return self._grants
+
+
+def _lazy_slot(cls, name, part):
+    """
+    Returns property for slot of cls, loading the part
+    of lazy object (see _LazyObject) on first access.
+    Assigned value is kept, and is not replaced by the
+    parsed one.
+    """
+
+    slot = getattr(cls, name)
+
+    def get(self):
+        if name in self._pending:
+            self._load(part)
+        return slot.__get__(self)
+
+    def set(self, value):
+        slot.__set__(self, value)
+        pending = getattr(self, '_pending', None)
+        if pending:
+            self._pending = pending - frozenset([name])
+
+    return property(get, set)
+
+
+class _LazyObject(object):
+    """
+    Mixin of table or view, which columns (with view sources)
+    and permits are parsed from its text on first access
+    """
+
+    __slots__ = ()
+
+    def _load(self, part):
+        context = self._context
+        if part == 'permits':
+            self.permits = {}
+            self.apply_privileges(context.grants())
+            return
+
+        # Attributes of the part, which were not assigned
+        pending = self._pending & frozenset(['cols', 'sources', 'is_union'])
+        self._pending = self._pending - pending
+        obj, nm, end = _scan_create(self.text)
+        if obj is None:
+            return
+        if 'sources' in pending and isinstance(obj, View):
+            self.sources = obj.sources
+        if 'is_union' in pending and isinstance(obj, View):
+            self.is_union = obj.is_union
+        if 'cols' in pending:
+            self.cols = obj.cols
+            colcomments = context.col_comments().get(self.name, {})
+            for c in self.cols:
+                c.desc = colcomments.get(c.name, c.desc)
+
+    def apply_privileges(self, grants):
+        # Privileges of the script are not applied before the given ones
+        if 'permits' in self._pending:
+            self.permits = {}
+        super(_LazyObject, self).apply_privileges(grants)
+
+
+class LazyTable(_LazyObject, Table):
+    """
+    Table, which columns and permits are parsed on first access
+    """
+
+    __slots__ = ('_context', '_pending')
+
+    cols = _lazy_slot(TableView, 'cols', 'cols')
+    permits = _lazy_slot(TableView, 'permits', 'permits')
+
+    def __init__(self, nm, dsc, txt, context):
+        super(LazyTable, self).__init__(nm, dsc, txt)
+        self._context = context
+        self._pending = frozenset(['cols', 'permits'])
+
+
+class LazyView(_LazyObject, View):
+    """
+    View, which columns, sources and permits are parsed
+    on first access
+    """
+
+    __slots__ = ('_context', '_pending')
+
+    cols = _lazy_slot(TableView, 'cols', 'cols')
+    permits = _lazy_slot(TableView, 'permits', 'permits')
+    sources = _lazy_slot(View, 'sources', 'cols')
+    is_union = _lazy_slot(View, 'is_union', 'cols')
+
+    def __init__(self, nm, dsc, txt, context):
+        super(LazyView, self).__init__(nm, dsc, txt)
+        self._context = context
+        self._pending = frozenset(['cols', 'permits', 'sources', 'is_union'])
+
+
+def iter_objects(sql, tables=True, views=True):
+    """
+    Parses Oracle-formatted SQL file and yields its tables
+    and views in order of their appearance, as they are found.
+
+    Only names, comments and texts of the objects are parsed
+    at once. Columns (with their comments), privileges and
+    sources of views are parsed on first access and kept
+    in the objects, so listing of names and comments of the
+    objects is several times faster than parse_schema.
+    Statements are not validated beyond their names, so the
+    objects of malformed statements have no columns.
+    Parsing of tables or views may be switched off with
+    the "tables" and "views" parameters.
+    """
+
+    if not (tables or views):
+        return
+    kind = None if tables and views else tables and 'TABLE' or 'VIEW'
+
+    sql = remove_sql_comments(sql)
+    tab_comments = parse_table_comments(sql)
+    context = _LazyContext(sql)
+
+    pos = 0
+    while True:
+        for m in RX_CREATE.finditer(sql, pos):
+            if m.lastindex:
+                break
+        else:
+            return
+
+        toks = _Tokens(sql, m.start())
+        toks.next()
+        while toks.word() in CREATE_MODIFIERS:
+            toks.next()
+        obj_kind = toks.word()
+        pos = toks.tok[2]
+        if obj_kind not in ('TABLE', 'VIEW') or kind and obj_kind != kind:
+            continue
+        toks.next()
+        nm = toks.name()
+        pos = toks.tok[2]
+        if nm is None:
+            continue
+
+        pos = RX_RAW_STATEMENT.match(sql, pos).end()
+        cls = LazyTable if obj_kind == 'TABLE' else LazyView
+        yield cls(nm, tab_comments.get(nm, ''), sql[m.start():pos], context)
+
+
+def _iter_creates(sql, kind=None):
+    """
+    Yields tuples of objects and their names, parsed from CREATE TABLE
+    or CREATE VIEW statements (only of the kind, if specified) of SQL
+    without comments. Keywords in quoted strings are skipped.
+    """
+
+    pos = 0
+    while True:
+        for m in RX_CREATE.finditer(sql, pos):
+            if m.lastindex:
+                break
+        else:
+            return
 
-    return views
+        obj, nm, pos = _scan_create(sql, m.start(), kind)
+        if obj is not None:
+            yield obj, nm
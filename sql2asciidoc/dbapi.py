@@ -0,0 +1,130 @@
+# Author: David Avsajanishvili
+# Contact: avsd05@gmail.com
+
+"""
+Pluggable layer of DB-API 2.0 drivers, connecting
+to databases by connection string
+"""
+
+__all__ = ['DRIVERS', 'DEFAULT_DRIVER', 'connect', 'ConnectionPool']
+
+import threading, Queue
+
+def _connect_oracle(connstr, nls_lang=None):
+    from oracle2asciidoc import connect as connect_oracle
+    return connect_oracle(connstr, nls_lang)
+
+def _connect_sqlite(connstr, nls_lang=None):
+    import sqlite3
+    # Connections of ConnectionPool are used by several threads,
+    # though by one at a time
+    return sqlite3.connect(connstr, check_same_thread=False)
+
+# Functions, connecting to database by connection string,
+# by names of the drivers
+DRIVERS = {
+    'oracle': _connect_oracle,
+    'sqlite': _connect_sqlite,
+}
+
+DEFAULT_DRIVER = 'oracle'
+
+def connect(connstr, driver=DEFAULT_DRIVER, nls_lang=None):
+    """
+    Connects to database and returns DB-API connection.
+
+    Parameters:
+
+        connstr -- connection string, passed to the driver.
+
+        driver -- name of one of DRIVERS, or name of DB-API module,
+            which "connect" function is called with connstr.
+            Queries use named parameters (:name), supported
+            by both cx_Oracle and sqlite3 drivers.
+
+        nls_lang -- optional NLS_LANG for Oracle driver.
+    """
+
+    func = DRIVERS.get(driver)
+    if func is None:
+        try:
+            module = __import__(driver, {}, {}, ['connect'])
+        except ImportError:
+            raise ImportError("Unknown database driver: %s" % driver)
+        return module.connect(connstr)
+
+    return func(connstr, nls_lang)
+
+class ConnectionPool(object):
+    """
+    Bounded pool of connections, shared by threads.
+
+    Connections are created by "connect" function (without
+    arguments) on demand, so no more than "size" connections
+    exist at once. A thread, acquiring connection when all of
+    them are in use, waits until one of them is released.
+
+    Usage:
+
+        pool = ConnectionPool(lambda: connect(connstr, driver), 4)
+        connection = pool.acquire()
+        try:
+            ...
+        finally:
+            pool.release(connection)
+        ...
+        pool.close()
+    """
+
+    def __init__(self, connect, size=1):
+        self.connect = connect
+        self.size = size
+        self.connections = []
+        self._idle = Queue.Queue()
+        self._free = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Returns idle connection, creating new one if needed
+        """
+
+        self._free.acquire()
+        try:
+            return self._idle.get_nowait()
+        except Queue.Empty:
+            pass
+
+        try:
+            connection = self.connect()
+        except:
+            self._free.release()
+            raise
+        self._lock.acquire()
+        try:
+            self.connections.append(connection)
+        finally:
+            self._lock.release()
+
+        return connection
+
+    def release(self, connection):
+        """
+        Returns connection, acquired by the thread, to the pool
+        """
+
+        self._idle.put(connection)
+        self._free.release()
+
+    def close(self):
+        """
+        Closes all connections of the pool
+        """
+
+        for connection in self.connections:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        self.connections = []
+        self._idle = Queue.Queue()
@@ -0,0 +1,237 @@
+# Author: David Avsajanishvili
+# Contact: avsd05@gmail.com
+
+"""
+Module for resolving columns of views to columns of tables,
+they are selected from, through aliases and nested views
+"""
+
+__all__ = ['Lineage', 'resolve_lineage', 'column_references']
+
+from db import Table, normalize_name, _iter_tokens
+
+def column_references(value):
+    """
+    Returns tuple of list of column references of expression
+    and flag, telling whether the expression is a single reference.
+    Each reference is a list of parts of (qualified) name,
+    normalized for lookups. Names of functions are skipped.
+    """
+
+    refs = []
+    parts = None
+    after_dot = False
+    ntokens = 0
+
+    for kind, text, start, end in _iter_tokens(value or ''):
+        if kind is None:
+            break
+        ntokens += 1
+
+        if kind in ('word', 'quoted') and not text[0].isdigit():
+            if parts is not None and after_dot:
+                parts.append(normalize_name(text))
+            else:
+                if parts:
+                    refs.append(parts)
+                parts = [normalize_name(text)]
+            after_dot = False
+            continue
+
+        if text == '.' and parts is not None and not after_dot:
+            after_dot = True
+            continue
+
+        # Function call
+        if text == '(':
+            parts = None
+        if parts:
+            refs.append(parts)
+        parts = None
+        after_dot = False
+
+    if parts:
+        refs.append(parts)
+
+    direct = len(refs) == 1 and ntokens == 2 * len(refs[0]) - 1
+    return refs, direct
+
+
+class Lineage(object):
+    """
+    Dependency graph of views of schema on their sources
+    (tables and views), resolving columns of views.
+
+    Usage:
+
+        lineage = Lineage(schema)
+        lineage.resolve()
+        for c in view.cols:
+            print c.name, c.origin
+
+    Views are resolved in topological order of the graph,
+    so columns of each view are resolved once, after columns
+    of the views it selects from, and their origins are reused
+    by all dependent views. Resolution takes linear time
+    of the number of views and columns.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+
+        # Objects by normalized full and short names
+        self.objects = {}
+        short = {}
+        for obj in schema.objects():
+            nm = normalize_name(obj.name)
+            self.objects[nm] = obj
+            short.setdefault(nm.rpartition('.')[2], []).append(obj)
+        self._short = dict([(k, v[0]) for k, v in short.iteritems() if len(v) == 1])
+
+        # Sources of each view as list of (alias, object)
+        self.sources = {}
+        for v in schema.views:
+            self.sources[v] = srcs = []
+            for src in v.sources:
+                nm, tmp, alias = src.strip().rpartition(" ")
+                if not nm:
+                    nm, alias = alias, ''
+                obj = self.find(nm)
+                if obj is not None:
+                    srcs.append((normalize_name(alias), obj))
+
+        # Columns of objects by normalized names
+        self._columns = {}
+
+    def find(self, nm):
+        """
+        Returns object by its (optionally qualified) name or None
+        """
+
+        nm = normalize_name(nm.strip())
+        obj = self.objects.get(nm)
+        if obj is None:
+            obj = self._short.get(nm.rpartition('.')[2])
+
+        return obj
+
+    def dependencies(self, view):
+        """
+        Returns list of views, the view selects from
+        """
+
+        return [obj for alias, obj in self.sources.get(view, ())
+                if obj is not view and obj in self.sources]
+
+    def order(self):
+        """
+        Returns list of views in topological order: each view
+        follows the views, it depends on. Views of cycles
+        are ordered arbitrarily.
+        """
+
+        order = []
+        visited = set()
+        for view in self.schema.views:
+            if view in visited:
+                continue
+            visited.add(view)
+            stack = [(view, iter(self.dependencies(view)))]
+            while stack:
+                node, deps = stack[-1]
+                for d in deps:
+                    if d not in visited:
+                        visited.add(d)
+                        stack.append((d, iter(self.dependencies(d))))
+                        break
+                else:
+                    stack.pop()
+                    order.append(node)
+
+        return order
+
+    def columns(self, obj):
+        """
+        Returns dictionary of columns of object by normalized names
+        """
+
+        cols = self._columns.get(obj)
+        if cols is None:
+            cols = self._columns[obj] = dict(
+                [(normalize_name(c.name), c) for c in obj.cols])
+
+        return cols
+
+    def _resolve_reference(self, view, parts):
+        """
+        Returns (object, column) of source of view, referenced
+        by parts of qualified name of column, or None
+        """
+
+        srcs = self.sources[view]
+        col = parts[-1]
+        if len(parts) == 1:
+            for alias, obj in srcs:
+                c = self.columns(obj).get(col)
+                if c is not None:
+                    return obj, c
+            return None
+
+        qualifier = ".".join(parts[:-1])
+        for alias, obj in srcs:
+            nm = normalize_name(obj.name)
+            if qualifier in (alias, nm, nm.rpartition('.')[2]):
+                c = self.columns(obj).get(col)
+                if c is not None:
+                    return obj, c
+
+        return None
+
+    def resolve(self, fill_desc=True):
+        """
+        Sets origins of columns of views: tuples of names
+        (object.column) of columns of tables, they are selected
+        from. Columns, which are not resolved, keep None.
+        If fill_desc is True, missing descriptions of columns,
+        selected from other columns as they are, are copied
+        from those columns.
+        Returns number of resolved columns.
+        """
+
+        resolved = 0
+        for view in self.order():
+            for c in view.cols:
+                if c.name == '*':
+                    continue
+                refs, direct = column_references(c.value)
+                origin = []
+                source = None
+                for parts in refs:
+                    found = self._resolve_reference(view, parts)
+                    if found is None:
+                        continue
+                    obj, source = found
+                    if isinstance(obj, Table):
+                        names = ("%s.%s" % (obj.name, source.name),)
+                    else:
+                        names = source.origin or ()
+                    for nm in names:
+                        if nm not in origin:
+                            origin.append(nm)
+
+                if origin:
+                    c.origin = tuple(origin)
+                    resolved += 1
+                if fill_desc and direct and source is not None and not c.desc:
+                    c.desc = source.desc
+
+        return resolved
+
+
+def resolve_lineage(schema, fill_desc=True):
+    """
+    Resolves columns of views of schema (see Lineage.resolve)
+    and returns number of resolved columns
+    """
+
+    return Lineage(schema).resolve(fill_desc)
@@ -14,11 +14,21 @@ Requires Python 2.6 and cx_Oracle
 to be installed on the workstation
 """
 
-import sys, os, getopt, codecs
+import sys, os, re, getopt, codecs, itertools, shutil
+from ConfigParser import RawConfigParser
+from multiprocessing.pool import ThreadPool
+import dbapi
+from cache import FileCache
 
-def get_table(sql, connstr, nls_lang=None):
+# Default number of rows, fetched from database at once
+DEFAULT_ARRAYSIZE = 500
+
+# Delimiter of table blocks of split output
+TABLE_SEP = "|============================================================"
+
+def connect(connstr, nls_lang=None):
     """
-    Retrieves data from table and returns it as list
+    Connects to Oracle database and returns connection
     """
 
     ###########################################
@@ -40,29 +50,293 @@ See also: http://www.orafaq.com/wiki/Python""")
 
     # if NLS_LANG is defined, set it to environment variable
     if nls_lang:
-        import os
         os.environ["NLS_LANG"] = nls_lang
 
-    connection = cx_Oracle.connect(connstr)
-    cursor = connection.cursor()
+    return cx_Oracle.connect(connstr)
+
+def nls_encoding(nls_lang):
+    """
+    Returns encoding of character set of NLS_LANG,
+    or None if no decoding needed (or it's unknown)
+    """
+
+    if not nls_lang:
+        return None
+    enc = nls_lang.split('.')[-1]
+    try:
+        codecs.lookup(enc)
+    except LookupError:
+        return None
+
+    return enc
+
+def fetch_unicode(cursor):
+    """
+    Makes cx_Oracle cursor fetch strings as unicode, decoded
+    by the driver from character set of NLS_LANG, with output
+    type handler. LONG columns are fetched as unicode only
+    if the driver has LONG_UNICODE type. Returns False
+    if cursor is of other driver.
+    """
+
+    module = sys.modules.get(type(cursor).__module__)
+    if not (hasattr(cursor, 'outputtypehandler') and hasattr(module, 'FIXED_CHAR')):
+        return False
+
+    string_types = (module.STRING, module.FIXED_CHAR)
+    long_type = getattr(module, 'LONG_STRING', None)
+    long_unicode = getattr(module, 'LONG_UNICODE', None)
+    def handler(cursor, name, default_type, size, precision, scale):
+        if default_type in string_types:
+            return cursor.var(unicode, size, cursor.arraysize)
+        if long_unicode is not None and default_type is long_type:
+            return cursor.var(long_unicode, arraysize=cursor.arraysize)
+
+    cursor.outputtypehandler = handler
+    return True
+
+def byte_string_columns(cursor, unicode_fetched=False):
+    """
+    Returns indexes of columns of executed cursor, which values
+    may be fetched as byte strings.
+
+    If strings are fetched as unicode (see fetch_unicode), these
+    are only LONG columns of cx_Oracle without LONG_UNICODE type.
+    Otherwise these are all columns, except of NUMBER, DATETIME
+    and ROWID types of DB-API module of the cursor.
+    """
+
+    module = sys.modules.get(type(cursor).__module__)
+    types = [d[1] for d in cursor.description or ()]
+    if unicode_fetched:
+        long_type = getattr(module, 'LONG_STRING', None)
+        if long_type is None or hasattr(module, 'LONG_UNICODE'):
+            return []
+        return [i for i, t in enumerate(types) if t == long_type]
+
+    other = [getattr(module, nm) for nm in ('NUMBER', 'DATETIME', 'ROWID')
+             if hasattr(module, nm)]
+    return [i for i, t in enumerate(types) if t is None or t not in other]
+
+def rows_decoder(encoding, columns):
+    """
+    Returns function, decoding byte strings of the columns
+    (list of indexes) of lists of rows from encoding, or None
+    if there are no columns. Each cell is decoded by its type,
+    as values of a column may be NULL or (with drivers, not
+    reporting types of columns) of different types.
+    """
+
+    if not columns:
+        return None
+
+    def decode(rows):
+        cols = zip(*rows)
+        for i in columns:
+            cols[i] = [b.decode(encoding) if type(b) is str else b
+                       for b in cols[i]]
+        return zip(*cols)
+    return decode
+
+def iter_batches(cursor, arraysize=DEFAULT_ARRAYSIZE):
+    """
+    Yields lists of rows, fetched from executed cursor
+    by arraysize rows at once. Arraysize of the cursor
+    is expected to be set before execution.
+    """
+
+    while True:
+        rows = cursor.fetchmany(arraysize)
+        if not rows:
+            break
+        yield rows
+
+def iter_query(cursor, sql, encoding=None, arraysize=DEFAULT_ARRAYSIZE):
+    """
+    Executes sql with cursor and yields lists of rows,
+    fetched by arraysize rows at once.
+
+    If encoding (see nls_encoding) is specified, strings are
+    decoded at fetch time: by cx_Oracle itself (see fetch_unicode),
+    and only the columns, still fetched as byte strings (by other
+    drivers or of other types), as batches are fetched (see
+    byte_string_columns and rows_decoder).
+    """
+
+    cursor.arraysize = arraysize
+    unicode_fetched = encoding and fetch_unicode(cursor)
     cursor.execute(sql)
 
-    ret = cursor.fetchall()
+    decode = None
+    if encoding:
+        decode = rows_decoder(encoding,
+                              byte_string_columns(cursor, unicode_fetched))
 
-    cursor.close()
-    connection.close()
+    for rows in iter_batches(cursor, arraysize):
+        if decode:
+            rows = decode(rows)
+        yield rows
 
-    if nls_lang:
+def iter_table(sql, connstr, nls_lang=None, arraysize=DEFAULT_ARRAYSIZE,
+               driver=dbapi.DEFAULT_DRIVER):
+    """
+    Retrieves data from table and yields it as lists of rows,
+    fetched by arraysize rows at once. Cursor and connection
+    are closed when all rows are fetched, on error, or when
+    the generator is closed.
+    Database driver may be specified (see dbapi.connect).
+    """
+
+    connection = dbapi.connect(connstr, driver, nls_lang)
+    try:
+        cursor = connection.cursor()
         try:
-            enc = nls_lang.split('.')[-1]
-            ret2 = [tuple(
-                            [isinstance(b,basestring) and unicode(b,enc) or b
-                             for b in a]
-                         )for a in ret]
-        except LookupError:
-            return ret
-        ret = ret2
-        
+            for rows in iter_query(cursor, sql, nls_encoding(nls_lang), arraysize):
+                yield rows
+        finally:
+            cursor.close()
+    finally:
+        connection.close()
+
+def read_manifest(filename):
+    """
+    Reads manifest of queries and returns list
+    of (name, sql, output filename) tuples.
+
+    Manifest is INI file, each section of which is a query,
+    named as the section, with "sql" and optional "output"
+    options. Output filename is relative to the directory
+    of the manifest; by default it's the name of the query
+    with asciidoc extension. For example:
+
+        [countries]
+        sql = select code, name
+                from countries
+               order by code
+        output = tables/countries.asciidoc
+    """
+
+    cfg = RawConfigParser()
+    f = open(filename)
+    try:
+        cfg.readfp(f)
+    finally:
+        f.close()
+
+    path = os.path.dirname(filename)
+    ret = []
+    for name in cfg.sections():
+        if not cfg.has_option(name, 'sql'):
+            raise ValueError("SQL of query %s not specified in %s" % (name, filename))
+        output = cfg.has_option(name, 'output') and cfg.get(name, 'output') \
+            or "%s.asciidoc" % name
+        ret.append((name, cfg.get(name, 'sql'), os.path.join(path, output)))
+
+    return ret
+
+def write_query(cursor, sql, output, encoding=None, arraysize=DEFAULT_ARRAYSIZE,
+                copy=None):
+    """
+    Executes sql with cursor and writes its result to output file
+    as rows of a table in asciidoc format. Returns number of rows.
+    If copy file is specified, the text is written to it as well.
+    """
+
+    batches = iter_query(cursor, sql, encoding, arraysize)
+
+    # Fetch the first rows before creating the file,
+    # so it is not created if the script fails
+    batches = itertools.chain([next(batches, [])], batches)
+
+    f = open(output, "w")
+    try:
+        return write_asciidoc(batches, f, copy=copy)
+    finally:
+        f.close()
+
+def run_manifest(entries, connstr, nls_lang=None, arraysize=DEFAULT_ARRAYSIZE,
+                 jobs=1, driver=dbapi.DEFAULT_DRIVER, cache=None):
+    """
+    Executes queries of manifest entries (see read_manifest),
+    writing result of each query to its output file, and yields
+    (name, output filename, number of rows, error) of each query
+    in order of the entries.
+
+    Queries are executed by "jobs" threads at once over a pool
+    of no more than "jobs" connections (see dbapi.ConnectionPool).
+    Each connection keeps its cursor, so that the logon is done
+    once per connection and parsed statements are reused by the
+    database. Error of a query (its exception, otherwise None)
+    doesn't stop execution of the other ones.
+
+    If cache (see cache.FileCache) is specified, results are
+    cached in it by result_key (written to data files of the cache
+    as they are fetched), and cached results are written
+    without executing queries; connections are made only
+    for the queries, which results are not cached.
+    """
+
+    pool = dbapi.ConnectionPool(
+        lambda: dbapi.connect(connstr, driver, nls_lang), jobs)
+    encoding = nls_encoding(nls_lang)
+
+    # Cursors by connections; a connection is used by one thread at once
+    cursors = {}
+
+    def run(entry):
+        name, sql, output = entry
+        try:
+            if cache is not None:
+                key = result_key(sql, connstr, nls_lang, driver)
+                n = read_cached(cache, key, output)
+                if n is not None:
+                    return name, output, n, None
+
+            data = cache.open_data(key) if cache is not None else None
+            connection = pool.acquire()
+            try:
+                cursor = cursors.get(id(connection))
+                if cursor is None:
+                    cursor = cursors[id(connection)] = connection.cursor()
+                n = write_query(cursor, sql, output, encoding, arraysize, data)
+            except:
+                if data is not None:
+                    cache.discard(data)
+                raise
+            finally:
+                pool.release(connection)
+
+            if data is not None:
+                cache.put(key, n, data)
+        except Exception, err:
+            return name, output, None, err
+
+        return name, output, n, None
+
+    try:
+        if jobs > 1 and len(entries) > 1:
+            threads = ThreadPool(min(jobs, len(entries)))
+            try:
+                for ret in threads.imap(run, entries):
+                    yield ret
+            finally:
+                threads.close()
+                threads.join()
+        else:
+            for entry in entries:
+                yield run(entry)
+    finally:
+        pool.close()
+
+def get_table(sql, connstr, nls_lang=None):
+    """
+    Retrieves data from table and returns it as list
+    """
+
+    ret = []
+    for rows in iter_table(sql, connstr, nls_lang):
+        ret.extend(rows)
+
     return ret
     
 def make_asciidoc(dct):
@@ -73,14 +347,169 @@ def make_asciidoc(dct):
 
     if not dct:
         return ""
-    
-    ret = ""
-    for row in dct:
-        for cell in row:
-            ret += "|%s " % unicode(cell or "").replace(r"|",r"\|")
-        ret += "\n"
-        
-    return ret
+
+    return u"".join([
+        u"".join([u"|%s " % unicode(cell or "").replace(r"|",r"\|")
+                  for cell in row]) + u"\n"
+        for row in dct])
+
+def write_asciidoc(batches, f, encoding="utf8", copy=None):
+    """
+    Writes lists of rows, as yielded by iter_table,
+    as rows of a table in asciidoc format to file f,
+    batch by batch. Returns number of rows written.
+    If copy file is specified, the text is written to it as well.
+    """
+
+    n = 0
+    for rows in batches:
+        s = codecs.encode(make_asciidoc(rows), encoding)
+        f.write(s)
+        if copy is not None:
+            copy.write(s)
+        n += len(rows)
+
+    return n
+
+def iter_fragments(batches, max_rows=None, max_bytes=None, encoding="utf8"):
+    """
+    Splits lists of rows, as yielded by iter_table, to fragments
+    of no more than max_rows rows and max_bytes bytes of asciidoc
+    (a fragment has one row at least, however large it is).
+    Fragments are numbered from 0, and yielded as they arrive
+    by pieces: (fragment number, number of rows, encoded text).
+    """
+
+    i = 0
+    nrows = 0
+    size = 0
+    for rows in batches:
+        piece = []
+        for row in rows:
+            s = codecs.encode(make_asciidoc([row]), encoding)
+            if nrows and ((max_rows and nrows >= max_rows) or
+                          (max_bytes and size + len(s) > max_bytes)):
+                if piece:
+                    yield i, len(piece), "".join(piece)
+                    piece = []
+                i += 1
+                nrows = size = 0
+            piece.append(s)
+            nrows += 1
+            size += len(s)
+        if piece:
+            yield i, len(piece), "".join(piece)
+
+def write_blocks(pieces, f, attributes=None):
+    """
+    Writes fragments, as yielded by iter_fragments, to file f
+    as consecutive table blocks, preceded with optional attributes
+    line. Returns number of rows and number of blocks written.
+    """
+
+    n = 0
+    cur = None
+    for i, nrows, s in pieces:
+        if i != cur:
+            if cur is not None:
+                f.write("%s\n\n" % TABLE_SEP)
+            if attributes:
+                f.write("%s\n" % attributes)
+            f.write("%s\n" % TABLE_SEP)
+            cur = i
+        f.write(s)
+        n += nrows
+    if cur is not None:
+        f.write("%s\n" % TABLE_SEP)
+
+    return n, cur is not None and cur + 1 or 0
+
+def fragment_name(filename, i):
+    """
+    Returns filename of i-th fragment of output filename
+    """
+
+    root, ext = os.path.splitext(filename)
+    return "%s-%03d%s" % (root, i + 1, ext or ".asciidoc")
+
+def write_fragment_files(pieces, filename, attributes=None):
+    """
+    Writes each of fragments, as yielded by iter_fragments, to its
+    own file (see fragment_name), and index file "filename", which
+    includes the fragments into consecutive table blocks, preceded
+    with optional attributes line. Only the current fragment file
+    is open at once. Returns number of rows and number of fragments.
+    """
+
+    n = 0
+    cur = None
+    f = None
+    index = open(filename, "w")
+    try:
+        for i, nrows, s in pieces:
+            if i != cur:
+                if f:
+                    f.close()
+                fn = fragment_name(filename, i)
+                f = open(fn, "w")
+                if cur is not None:
+                    index.write("\n")
+                if attributes:
+                    index.write("%s\n" % attributes)
+                index.write("%s\ninclude::%s[]\n%s\n" % (
+                    TABLE_SEP, os.path.basename(fn), TABLE_SEP))
+                cur = i
+            f.write(s)
+            n += nrows
+    finally:
+        if f:
+            f.close()
+        index.close()
+
+    return n, cur is not None and cur + 1 or 0
+
+# Password of Oracle connection string (user/password@database)
+RX_ORACLE_PASSWORD = re.compile(r"^([^/@]*)/(?:.*(?=@)|.*)")
+
+# Password of key-value connection string (password=...)
+RX_PASSWORD = re.compile(r"\b(password|pwd)\s*=\s*[^\s;]*", re.IGNORECASE)
+
+def result_key(sql, connstr, nls_lang=None, driver=dbapi.DEFAULT_DRIVER):
+    """
+    Returns key of cached result of sql: connection identity
+    (driver and connection string without password), NLS_LANG
+    and text of sql
+    """
+
+    if driver == 'oracle':
+        identity = RX_ORACLE_PASSWORD.sub(r"\1", connstr)
+    else:
+        identity = RX_PASSWORD.sub(r"\1=", connstr)
+
+    return "%s\n%s\n%s\n%s" % (driver, identity, nls_lang or '', sql.strip())
+
+def read_cached(cache, key, output):
+    """
+    Writes result, cached by key, to output file
+    (or stdout, if output is None). Returns number
+    of rows or None, if the result is not cached.
+    """
+
+    cached = cache.get_data(key)
+    if cached is None:
+        return None
+
+    n, data = cached
+    try:
+        f = output and open(output, "w") or sys.stdout
+        try:
+            shutil.copyfileobj(data, f)
+        finally:
+            f.close()
+    finally:
+        data.close()
+
+    return n
     
 def main(argv):
     """
@@ -89,17 +518,53 @@ def main(argv):
 
     Usage:
         %(command)s [options] sql_command
+        %(command)s [options] -f manifest_filename
         
     Options:
+        -b, --batch-size=ROWS
+            Number of rows fetched from database and written
+            at once. Default: 500
+        --cache-dir=DIRECTORY
+            Directory to cache results of the queries in.
+            Cached results are written without connecting
+            to the database. Results are cached by connection
+            string (without password), NLS and SQL of the query.
+        --cache-ttl=MINUTES
+            Time, results are cached for. Default: 60
+        --cache-max-size=MB
+            Maximal size of the cache, in megabytes.
+            The oldest results are evicted.
         -c, --connection-string=CONNSTRING
             Connection string to connect to Oracle DB, mandatory.
+        --driver=DRIVER
+            Database driver: "oracle", "sqlite" or name
+            of DB-API module. Default: oracle
+        -f, --manifest=FILENAME
+            Execute queries of the manifest over single
+            connection, writing each to its own output file.
+            Manifest is INI file with a section per query,
+            having "sql" and "output" options.
         -h, --help
             Display this help message.
+        -j, --jobs=JOBS
+            Number of queries of the manifest, executed
+            at once over separate connections. Default: 1
         -n, --nls
             NLS language definition (for example, "AMERICAN_AMERICA.UTF8")
         -o, --output=FILENAME
             Output file. If not specified, goes to standard
             output (stdout).
+        --split-rows=ROWS
+            Split output into table blocks of no more than ROWS rows.
+        --split-bytes=BYTES
+            Split output into table blocks of no more than BYTES bytes.
+        --split-files
+            Write each block of split output into its own file
+            (output FILENAME with block number), and include
+            them into the table blocks of the output file.
+        --table-attributes=ATTRIBUTES
+            Attributes line, preceding each block of split output,
+            for example: [cols="1,3",options="header"]
         -v, --verbose
             Write detailed information to stderr.
     """
@@ -118,13 +583,27 @@ def main(argv):
     try:
         opts, args = getopt.getopt(
             argv[1:],
-            "n:o:c:vh",
-            ["output=", "connection-string=", "verbose", "help", "nls="])
+            "n:o:c:b:f:j:vh",
+            ["output=", "connection-string=", "verbose", "help", "nls=",
+             "batch-size=", "manifest=", "jobs=", "driver=",
+             "cache-dir=", "cache-ttl=", "cache-max-size=",
+             "split-rows=", "split-bytes=", "split-files", "table-attributes="])
 
         sql = args and " ".join(args) or None
         connstr = None
         outfile = None
         nls = None
+        arraysize = DEFAULT_ARRAYSIZE
+        manifest = None
+        jobs = 1
+        driver = dbapi.DEFAULT_DRIVER
+        cache_dir = None
+        cache_ttl = 60
+        cache_max_size = None
+        split_rows = None
+        split_bytes = None
+        split_files = False
+        attributes = None
 
     except getopt.GetoptError, err:
         print main.__doc__ % locals()
@@ -145,6 +624,54 @@ def main(argv):
             nls = a
         elif o in ("-c", "--connection-string"):
             connstr = a
+        elif o in ("-f", "--manifest"):
+            manifest = a
+        elif o in ("-j", "--jobs"):
+            try:
+                jobs = int(a)
+            except ValueError:
+                jobs = 0
+            if jobs <= 0:
+                log_error("Invalid number of jobs: %s" % a)
+                return -2
+        elif o == "--driver":
+            driver = a
+        elif o == "--cache-dir":
+            cache_dir = a
+        elif o in ("--cache-ttl", "--cache-max-size"):
+            try:
+                a = float(a)
+            except ValueError:
+                log_error("Invalid value of %s: %s" % (o, a))
+                return -2
+            if o == "--cache-ttl":
+                cache_ttl = a
+            else:
+                cache_max_size = a
+        elif o in ("--split-rows", "--split-bytes"):
+            try:
+                n = int(a)
+            except ValueError:
+                n = 0
+            if n <= 0:
+                log_error("Invalid value of %s: %s" % (o, a))
+                return -2
+            if o == "--split-rows":
+                split_rows = n
+            else:
+                split_bytes = n
+        elif o == "--split-files":
+            split_files = True
+        elif o == "--table-attributes":
+            attributes = a
+        elif o in ("-b", "--batch-size"):
+            try:
+                arraysize = int(a)
+            except ValueError:
+                arraysize = 0
+            if arraysize <= 0:
+                log_error("Invalid batch size: %s" % a)
+                return -2
         elif o in ("-h", "--help"):
             print main.__doc__ % locals()
             return 0
@@ -157,25 +684,95 @@ def main(argv):
         log_error("Oracle connection string not specified!")
         return -2
 
+    if manifest and (sql or outfile):
+        log_error("SQL and output file can't be specified with manifest!")
+        return -2
+
+    split = bool(split_rows or split_bytes or split_files)
+    if split and (manifest or cache_dir):
+        log_error("Output can't be split with manifest or cache!")
+        return -2
+    if split_files and not outfile:
+        log_error("Output file must be specified to split it into files!")
+        return -2
+
+    cache = None
+    if cache_dir:
+        cache = FileCache(cache_dir, touch=False,
+                          max_age = cache_ttl * 60,
+                          max_size = cache_max_size and int(cache_max_size * 1024 * 1024))
+
+    failed = 0
     try:
-        # Get SQL
-        if not sql:
-            sql = sys.stdin.read()
-            sys.stdin.close()
-        
-        # Get data from Oracle
-        log("Executing script: \n\t%s" % sql)
-        ctnt = get_table(sql, connstr, nls)
-
-        # Generate
-        log("Generating ASCIIDOC...")
-        ret = make_asciidoc(ctnt)
-
-        # Write ASCIIDOC
-        log("Writing file %s ..." % (outfile or 'stdout'))
-        f = outfile and open(outfile, "w") or sys.stdout
-        f.write(codecs.encode(ret,"utf8"))
-        f.close()
+        if manifest:
+            # Execute queries of the manifest
+            entries = read_manifest(manifest)
+            log("Executing %d queries of %s ..." % (len(entries), manifest))
+            for name, output, n, err in run_manifest(entries, connstr, nls,
+                                                     arraysize, jobs, driver,
+                                                     cache):
+                if err is None:
+                    log("%s: %d rows written to %s" % (name, n, output))
+                else:
+                    log_error("Error in query %s: %s" % (name, err))
+                    failed += 1
+            if failed:
+                log_error("%d of %d queries failed" % (failed, len(entries)))
+
+        else:
+            # Get SQL
+            if not sql:
+                sql = sys.stdin.read()
+                sys.stdin.close()
+
+            n = None
+            if cache:
+                key = result_key(sql, connstr, nls, driver)
+                n = read_cached(cache, key, outfile)
+                if n is not None:
+                    log("Cached result written to %s" % (outfile or 'stdout'))
+
+            if n is None:
+                # Get data from Oracle
+                log("Executing script: \n\t%s" % sql)
+                batches = iter_table(sql, connstr, nls, arraysize, driver)
+
+                # Fetch the first rows before creating the file,
+                # so it is not created if the script fails
+                batches = itertools.chain([next(batches, [])], batches)
+
+                # Generate and write ASCIIDOC as rows are fetched
+                log("Writing file %s ..." % (outfile or 'stdout'))
+                if split_files:
+                    n, blocks = write_fragment_files(
+                        iter_fragments(batches, split_rows, split_bytes),
+                        outfile, attributes)
+                    log("%d files written" % blocks)
+                elif split:
+                    f = outfile and open(outfile, "w") or sys.stdout
+                    n, blocks = write_blocks(
+                        iter_fragments(batches, split_rows, split_bytes),
+                        f, attributes)
+                    f.close()
+                    log("%d table blocks written" % blocks)
+                else:
+                    data = cache and cache.open_data(key)
+                    f = outfile and open(outfile, "w") or sys.stdout
+                    try:
+                        n = write_asciidoc(batches, f, copy=data)
+                    except:
+                        if data:
+                            cache.discard(data)
+                        raise
+                    finally:
+                        f.close()
+                    if data:
+                        cache.put(key, n, data)
+            log("%d rows written" % n)
+
+        if cache:
+            log("Cache: %d hits, %d misses" % (cache.hits, cache.misses))
+            log("Cache: %d entries evicted" % cache.evict())
 
         log("Done!")
         
@@ -184,4 +781,4 @@ def main(argv):
         raise
 
     log("")
-    return 0
+    return failed and 1 or 0
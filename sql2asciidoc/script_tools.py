@@ -9,8 +9,14 @@ command-line options, parsing database structure.
 __all__ = ['TOP_COMMENT', 'TABLE_SEP', 'sql_to_asciidoc', 'main_sql2asciidoc']
 
 from db import *
+from db import normalize_name
 import asciidoc
-import getopt, os, re
+from cache import FileCache
+import catalog, dbapi
+from stats import Stats, NULL_STATS
+from lineage import resolve_lineage
+from watch import WarmSchema
+import cProfile, getopt, glob, hashlib, json, os, re, time
 import sys
 
 TOP_COMMENT = \
@@ -28,8 +34,12 @@ VIEWS_CPT = "Views"
 
 TABLE_SEP = "|============================================================"
 
-# Text inclusions
-TEXT_INCLS = []
+# Index file and manifest of hashes of split output (see write_split)
+SPLIT_INDEX = "index.asciidoc"
+SPLIT_MANIFEST = "manifest.json"
+
+# Name of output file of --catalog in output directory
+CATALOG_OUTPUT = "catalog.asciidoc"
 
 def preformat_coldesc(txt):
     """
@@ -86,6 +96,8 @@ def columndict_callback(c):
         'default'   : subQ(c.default),
         'defaultf'  : ("\n\n*Default: %s*" % subQ(c.default))
                         if c.default else '',
+        'originf'   : ("\n\n*Origin: %s*" % ", ".join(c.origin))
+                        if c.origin else '',
         'notnull'   : '' if c.nullable else ' not null',
         'desc': c.desc,
         'descf': preformat_coldesc(c.desc),        
@@ -123,27 +135,23 @@ def grants_to_asciidoc(obj):
 """ % locals()
             
     
-def tables_to_asciidoc(
-        sql,
+def iter_tables_asciidoc(
+        tables,
         title_char = r'~'):
 
     """
-    Renders SQL with Tables creation DDL -- to ASCIIDOC.
+    Renders list of Table objects to ASCIIDOC,
+    yielding it by chunks, one per table.
     """
 
-        
-    ret = ""
     coldesctbl_header = "|Column |Type |Description"
     coldesctbl_attributes = '[cols="8m,5m,15",options="header"]'
-    
-    # Parse tables
-    tbs = parse_tables(sql)
 
     # Some globals to locals
     table_sep = TABLE_SEP
 
     # Render tables
-    for t in tbs:
+    for t in tables:
 
         tnm = t.name
         ttl = title_char * len(tnm)
@@ -151,7 +159,7 @@ def tables_to_asciidoc(
         cols = t.render_cols("|%(name)s  |%(type)s|%(descf)s%(defaultf)s\n", columndict_callback)
         grants = grants_to_asciidoc(t)
 
-        ret += """
+        yield """
 %(tnm)s
 %(ttl)s
 
@@ -167,45 +175,55 @@ def tables_to_asciidoc(
 %(grants)s
 """ % locals()
 
-    return ret
-
 
-def views_to_asciidoc(
+def tables_to_asciidoc(
         sql,
         title_char = r'~'):
 
     """
-    Renders SQL with Views creation DDL -- to ASCIIDOC.
+    Renders SQL with Tables creation DDL -- to ASCIIDOC.
+    Already parsed Schema object may be passed instead of SQL.
+    """
+
+    # Parse tables
+    tbs = sql.tables if isinstance(sql, Schema) else parse_tables(sql)
+
+    return "".join(iter_tables_asciidoc(tbs, title_char))
+
+
+def iter_views_asciidoc(
+        views,
+        title_char = r'~'):
+
+    """
+    Renders list of View objects to ASCIIDOC,
+    yielding it by chunks, one per view.
+    Scripts of UNION views are included as [source,sql]
+    listing blocks, which are not to be linked (see RenderContext).
     """
 
-    global TEXT_INCLS
-        
-    ret = ""
     coldesctbl_attributes = '[cols="8m,8m,12",options="header"]'
     coldesctbl_header = "|Alias |Value |Description"
-        
-    # Parse tables
-    vws = parse_views(sql)
 
     # Some globals to locals
     table_sep = TABLE_SEP
 
     # Render views
-    for t in vws:
+    for t in views:
 
         tnm = t.name
         ttl = title_char * len(tnm)
         dsc = t.desc
-        cols = t.render_cols("|%(name)s  |+++%(value)s+++|%(descf)s\n", columndict_callback)
+        cols = t.render_cols("|%(name)s  |+++%(value)s+++|%(descf)s%(originf)s\n", columndict_callback)
         grants = grants_to_asciidoc(t)
 
-        ret += """
+        ret = ["""
 %(tnm)s
 %(ttl)s
 
 %(dsc)s
 
-""" % locals()
+""" % locals()]
 
         if t.sources:
             srcs = ""
@@ -222,7 +240,7 @@ def views_to_asciidoc(
                     (b if a else '').replace(r"|", r"\|"),
                     )
                 
-            ret += """
+            ret.append("""
 .Sources of the view
 [cols="8m,5m",options="header",width="70%%"]
 %(table_sep)s
@@ -230,10 +248,10 @@ def views_to_asciidoc(
 %(srcs)s
 %(table_sep)s
 
-""" % locals()
+""" % locals())
 
         if cols:
-            ret += """
+            ret.append("""
 .Columns of the view
 %(coldesctbl_attributes)s
 %(table_sep)s
@@ -241,31 +259,47 @@ def views_to_asciidoc(
 %(cols)s
 %(table_sep)s
 
-""" % locals()
+""" % locals())
 
         if t.is_union:
-            TEXT_INCLS.append(t.text)
-            ret += """
+            delim = asciidoc.listing_delimiter(t.text)
+            ret.append("""
 
 The view is created using UNION select. Script of the view
 is shown below:
             
 .View SQL
 [source,sql]
-------------------------------------------------------------
-INCLUSION_%d
-------------------------------------------------------------
-""" % (len(TEXT_INCLS) - 1)
+%s
+%s
+%s
+""" % (delim, t.text, delim))
 
         if grants:
-            ret += "\n\n%s\n\n" % grants
+            ret.append("\n\n%s\n\n" % grants)
 
-    return ret
+        yield "".join(ret)
 
 
-def objects_to_comments(sql):
+def views_to_asciidoc(
+        sql,
+        title_char = r'~'):
+
+    """
+    Renders SQL with Views creation DDL -- to ASCIIDOC.
+    Already parsed Schema object may be passed instead of SQL.
+    """
+
+    # Parse views
+    vws = sql.views if isinstance(sql, Schema) else parse_views(sql)
+
+    return "".join(iter_views_asciidoc(vws, title_char))
+
+
+def iter_objects_comments(objs):
     """
-    Parses tables, views, columns and makes file of comments
+    Makes SQL comments of list of tables and views,
+    yielding them by chunks, one per object.
     """
     
     def colf(c):
@@ -277,12 +311,9 @@ def objects_to_comments(sql):
             'name'      : c.name,
             'desc'      : (c.desc or "").replace("'", "''"),
         }
-    
-    # Parse tables & views
-    objs = parse_tables(sql) + parse_views(sql)
 
     # Render objects
-    ret = """
+    yield """
 -- COMMENTS    ON    DATABASE    OBJECTS --
 -- Auto-generated from SQL CREATE script --
 -------------------------------------------
@@ -293,15 +324,463 @@ def objects_to_comments(sql):
         dsc = (o.desc or "").replace("'", "''")
         cols = o.render_cols("comment on column %s.%%(name)s\n  is '%%(desc)s';\n" % onm, colf)
         
-        ret += """
+        yield """
 ------ %(OTP)s: %(onm)s ------
 comment on table %(onm)s
   is '%(dsc)s';
 %(cols)s
 """ % locals()
 
+
+def objects_to_comments(sql):
+    """
+    Parses tables, views, columns and makes file of comments.
+    Already parsed Schema object may be passed instead of SQL.
+    """
+
+    # Parse tables & views
+    if not isinstance(sql, Schema):
+        sql = parse_schema(sql)
+
+    return "".join(iter_objects_comments(sql.objects()))
+
+
+def comments_diff(objs, baseline):
+    """
+    Compares comments of tables and views and their columns
+    with comments of the same objects of baseline: list of tables
+    and views, parsed from previous version of SQL or read from
+    catalog. Objects and columns are matched by names (objects
+    qualified with owner or not); missing comments are the same
+    as empty ones.
+
+    Returns list of tuples of object and list of its changed
+    comments: tuples of name of column (None for comment
+    of the object itself) and the new comment.
+    """
+
+    # Baseline objects by normalized full and short names
+    full = {}
+    short = {}
+    for o in baseline:
+        nm = normalize_name(o.name)
+        full[nm] = o
+        short.setdefault(nm.rpartition('.')[2], []).append(o)
+
+    ret = []
+    for o in objs:
+        nm = normalize_name(o.name)
+        base = full.get(nm)
+        if base is None:
+            found = short.get(nm.rpartition('.')[2], ())
+            base = len(found) == 1 and found[0] or None
+
+        base_desc = ''
+        base_cols = {}
+        if base is not None:
+            base_desc = base.desc or ''
+            base_cols = dict([(normalize_name(c.name), c.desc or '') for c in base.cols])
+
+        changes = []
+        if (o.desc or '') != base_desc:
+            changes.append((None, o.desc or ''))
+        for c in o.cols:
+            if c.name != '*' and (c.desc or '') != base_cols.get(normalize_name(c.name), ''):
+                changes.append((c.name, c.desc or ''))
+
+        if changes:
+            ret.append((o, changes))
+
+    return ret
+
+
+def comment_statement(onm, colname, comment):
+    """
+    Returns COMMENT ON TABLE (if colname is None) or COMMENT ON COLUMN
+    statement without terminating semicolon
+    """
+
+    comment = comment.replace("'", "''")
+    if colname is None:
+        return "comment on table %s\n  is '%s'" % (onm, comment)
+
+    return "comment on column %s.%s\n  is '%s'" % (onm, colname, comment)
+
+
+def iter_comments_diff(changes):
+    """
+    Makes SQL comments of changes, returned by comments_diff,
+    yielding them by chunks, one per object.
+    """
+
+    yield """
+-- CHANGED COMMENTS ON DATABASE OBJECTS --
+-- Auto-generated from SQL CREATE script --
+-------------------------------------------
+"""
+    for o, comments in changes:
+        yield "\n------ %s: %s ------\n%s" % (
+            o._obj_type.upper(), o.name,
+            "".join(["%s;\n" % comment_statement(o.name, colname, comment)
+                     for colname, comment in comments]))
+
+
+def _heading_titles(s, ch):
+    return asciidoc.find_titles("%s\n%s" % (s, ch*len(s)))
+
+
+def object_titles(obj, title_char=r'~'):
+    """
+    Returns titles of ASCIIDOC of table or view: its name
+    and titles in descriptions of it and its columns
+    """
+
+    ret = _heading_titles(obj.name, title_char)
+    ret.extend(asciidoc.find_titles(obj.desc or ''))
+    for c in obj.cols:
+        ret.extend(asciidoc.find_titles(c.desc or ''))
+
+    return ret
+
+
+def schema_titles(schema, cpt_char=None, title_char=r'~', object_titles_func=None):
+    """
+    Returns titles of ASCIIDOC document of parsed Schema
+    (see schema_to_asciidoc) in order of their appearance,
+    without rendering the document: captions, names of
+    the objects and titles in descriptions.
+    Optional object_titles_func is called instead of
+    object_titles with each object.
+    """
+
+    heading = _heading_titles
+    titles_func = object_titles_func or (lambda o: object_titles(o, title_char))
+
+    def objects_titles(objs):
+        for o in objs:
+            ret.extend(titles_func(o))
+
+    ret = []
+    if cpt_char:
+        ret.extend(heading(TABLES_CPT, cpt_char))
+    objects_titles(schema.tables)
+    if cpt_char and schema.views:
+        ret.extend(heading(VIEWS_CPT, cpt_char))
+        objects_titles(schema.views)
+
+    return ret
+
+
+class RenderContext(object):
+    """
+    Context of rendering of parsed Schema to ASCIIDOC document
+    with title references (see schema_to_asciidoc).
+
+    Keeps everything, the rendering of one document depends on:
+    the schema, options, linker of its titles and stats.
+    Nothing is shared between contexts, so several documents
+    may be rendered at once in parallel threads.
+
+    Titles are taken from the Schema (see schema_titles), so each
+    chunk of the document is linked as soon as it is rendered.
+    Scripts of the views are inlined into [source,sql] listing
+    blocks, which the linker leaves untouched.
+
+    Usage:
+
+        for chunk in RenderContext(schema, '=', '~'):
+            f.write(chunk)
+
+    Context, created with keep=True, keeps titles and chunks of the
+    objects. They are reused by the context of the next version
+    of the schema, created with the context as previous, for the
+    objects, which are not changed (the same instances), so only
+    changed objects are rendered again. Unless titles of the
+    document change, linked chunks are reused as well.
+    """
+
+    def __init__(self, schema, cpt_char=None, title_char=r'~', stats=None,
+                 previous=None, keep=False):
+        self.schema = schema
+        self.cpt_char = cpt_char
+        self.title_char = title_char
+        self.stats = stats or NULL_STATS
+
+        if previous is not None and (previous.cpt_char, previous.title_char) \
+                != (cpt_char, title_char):
+            previous = None
+        self._previous = previous
+
+        # Titles, chunks and linked chunks of objects
+        self._memo = keep and ({}, {}, {})
+
+        with self.stats.stage('link'):
+            self.titles = schema_titles(schema, cpt_char, title_char, self._object_titles)
+            if previous is not None and previous.titles == self.titles:
+                self.linker = previous.linker
+            else:
+                self.linker = asciidoc.TitleLinker(self.titles, skip_source=True)
+                self._previous = previous and previous.unlinked()
+        self.stats.count('link', titles=len(self.linker.titles))
+
+    def unlinked(self):
+        """
+        Returns copy of the context without linked chunks
+        """
+
+        ret = object.__new__(RenderContext)
+        ret.__dict__.update(self.__dict__)
+        if self._memo:
+            ret._memo = self._memo[:2] + ({},)
+
+        return ret
+
+    def _reuse(self, i, obj, func):
+        """
+        Returns i-th memo of object (see __init__), taken
+        from previous context or made by func
+        """
+
+        value = None
+        prev = self._previous
+        if prev is not None and prev._memo:
+            value = prev._memo[i].get(obj)
+        if value is None:
+            value = func(obj)
+        if self._memo:
+            self._memo[i][obj] = value
+
+        return value
+
+    def _object_titles(self, obj):
+        return self._reuse(0, obj, lambda o: object_titles(o, self.title_char))
+
+    def render_object(self, obj):
+        """
+        Returns chunk of table or view, not linked yet
+        """
+
+        def render(o):
+            func = iter_views_asciidoc if isinstance(o, View) else iter_tables_asciidoc
+            return "".join(func([o], self.title_char))
+
+        return self._reuse(1, obj, render)
+
+    def iter_chunks(self):
+        """
+        Yields (object, chunk) of the document, not linked yet.
+        Object is the table or view, rendered to the chunk,
+        or None for the top comment and captions.
+        """
+
+        schema = self.schema
+        cpt_char = self.cpt_char
+
+        yield None, TOP_COMMENT
+
+        if cpt_char:
+            yield None, "\n\n%s\n%s\n" % (TABLES_CPT, cpt_char*len(TABLES_CPT))
+
+        # Render Tables
+        for t in schema.tables:
+            yield t, self.render_object(t)
+
+        if cpt_char and schema.views:
+            # Render Views
+            yield None, "\n\n%s\n%s\n" % (VIEWS_CPT, cpt_char*len(VIEWS_CPT))
+            for v in schema.views:
+                yield v, self.render_object(v)
+
+    def iter_linked(self):
+        """
+        Yields (object, chunk) of the document (see iter_chunks)
+        with title references
+        """
+
+        stats = self.stats
+        link = self.linker.link
+        chunks = self.iter_chunks()
+
+        while True:
+            with stats.stage('render'):
+                t = next(chunks, None)
+            if t is None:
+                break
+            obj, chunk = t
+            stats.count('render', bytes=len(chunk))
+
+            with stats.stage('link'):
+                if obj is None:
+                    chunk = link(chunk)
+                else:
+                    chunk = self._reuse(2, obj, lambda o: link(chunk))
+            yield obj, chunk
+
+        stats.count('render', tables=len(self.schema.tables),
+                    views=self.cpt_char and len(self.schema.views) or 0)
+
+        # All the chunks are rendered, so the previous context
+        # is not needed any more
+        self._previous = None
+
+    def __iter__(self):
+        """
+        Yields chunks of the document with title references
+        """
+
+        for obj, chunk in self.iter_linked():
+            yield chunk
+
+
+def iter_schema_asciidoc(schema, cpt_char=None, title_char=r'~', stats=None):
+    """
+    Renders parsed Schema to ASCIIDOC document with title references
+    (see schema_to_asciidoc), yielding it by chunks as it is rendered.
+    Optional stats (see stats.Stats) collect timings and counters
+    of rendering and linking.
+    """
+
+    return iter(RenderContext(schema, cpt_char, title_char, stats))
+
+
+def schema_to_asciidoc(schema, cpt_char=None, title_char=r'~', stats=None):
+    """
+    Renders parsed Schema to ASCIIDOC document with title references.
+
+    Views are rendered only if cpt_char is specified; it is used
+    as underline for "Tables" and "Views" captions.
+    Optional stats (see stats.Stats) collect timings and counters
+    of rendering and linking.
+    """
+
+    return "".join(RenderContext(schema, cpt_char, title_char, stats))
+
+
+def fragment_name(obj, taken):
+    """
+    Returns name of file of the object in split output,
+    other than the names, already taken
+    """
+
+    nm = re.sub(r"\W+", "_", obj.name).strip("_").lower() or "object"
+    fn = "%s.asciidoc" % nm
+    i = 1
+    while fn in taken:
+        i += 1
+        fn = "%s_%d.asciidoc" % (nm, i)
+
+    return fn
+
+
+def _is_plain_name(fn):
+    """
+    Tells whether fn is name of file without directory
+    """
+
+    return isinstance(fn, basestring) and fn not in ('', os.curdir, os.pardir) \
+        and fn != SPLIT_MANIFEST and not os.path.isabs(fn) \
+        and not [s for s in ('/', '\\', os.sep, os.altsep) if s and s in fn]
+
+
+def write_split(context, directory):
+    """
+    Writes ASCIIDOC document of RenderContext, split into files
+    of the directory: a file per table and view, index file
+    (SPLIT_INDEX), including them in order, and manifest
+    (SPLIT_MANIFEST) of hashes of contents of the files.
+
+    Files, which contents didn't change since the previous run,
+    are not rewritten, so they keep their modification times.
+    Files of the objects, removed since then, are deleted.
+    Returns numbers of written, unchanged and deleted files.
+    """
+
+    stats = context.stats
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    manifest = os.path.join(directory, SPLIT_MANIFEST)
+    try:
+        f = open(manifest)
+        try:
+            old = json.load(f)
+        finally:
+            f.close()
+    except (IOError, ValueError):
+        old = {}
+    if not isinstance(old, dict):
+        old = {}
+
+    # Hashes of the files and numbers of written and unchanged ones.
+    # Name of the index is reserved, so no object takes it.
+    hashes = {SPLIT_INDEX: None}
+    counts = [0, 0]
+
+    def put(fn, content):
+        if isinstance(content, unicode):
+            content = content.encode('utf8')
+        h = hashes[fn] = hashlib.sha1(content).hexdigest()
+        path = os.path.join(directory, fn)
+        if old.get(fn) == h and os.path.exists(path):
+            counts[1] += 1
+            return
+        with stats.stage('write'):
+            f = open(path, "w")
+            f.write(content)
+            f.close()
+        stats.count('write', files=1, bytes=len(content))
+        counts[0] += 1
+
+    index = []
+    for obj, chunk in context.iter_linked():
+        if obj is None:
+            index.append(chunk)
+        else:
+            fn = fragment_name(obj, hashes)
+            put(fn, chunk)
+            index.append("\ninclude::%s[]\n" % fn)
+    put(SPLIT_INDEX, "".join(index))
+
+    # Delete files of removed objects. Only plain names of files
+    # of the directory are deleted, whatever the manifest contains.
+    deleted = 0
+    for fn in old:
+        if fn not in hashes and _is_plain_name(fn):
+            try:
+                os.remove(os.path.join(directory, fn))
+                deleted += 1
+            except OSError:
+                pass
+
+    if hashes != old:
+        f = open(manifest, "w")
+        json.dump(hashes, f, indent=2, sort_keys=True)
+        f.close()
+
+    return counts[0], counts[1], deleted
+
+
+def find_sql_files(paths):
+    """
+    Returns list of files from paths, expanding directories
+    (searched recursively for *.sql files) and glob patterns.
+    Files found in a directory or by a pattern are sorted.
+    """
+
+    ret = []
+    for p in paths:
+        if os.path.isdir(p):
+            found = []
+            for root, dirs, files in os.walk(p):
+                found.extend([os.path.join(root, fn) for fn in files
+                              if fn.lower().endswith('.sql')])
+            ret.extend(sorted(found))
+        elif glob.has_magic(p):
+            ret.extend(sorted(glob.glob(p)))
+        else:
+            ret.append(p)
+
     return ret
-    
 
 
 def main(argv):
@@ -310,9 +789,36 @@ def main(argv):
                   passed as command-line in argv.
 
     Usage:
-        %(command)s [options] sql_filename
+        %(command)s [options] [sql_filename ...]
         
     Options:
+        --apply
+            Execute the changed comments (see --baseline-catalog)
+            in the database of the baseline catalog, as well
+            as write them to the output. With oracle driver,
+            they are executed in batches.
+        --baseline=FILENAME
+            With -m, generate only comments, which differ from
+            comments in SQL file FILENAME (e.g. previous version
+            of the script).
+        --baseline-catalog=CONNSTRING
+            With -m, generate only comments, which differ from
+            comments in data dictionary of the database,
+            connecting with CONNSTRING.
+        --cache-dir=DIRECTORY
+            Directory to cache parsed tables and views in.
+            Only statements, changed since the previous run,
+            are parsed (SQL is parsed statement by statement).
+        --cache-max-age=DAYS
+            Cached objects, not used for DAYS, are evicted.
+            Default: 30
+        --cache-max-size=MB
+            Maximal size of the cache, in megabytes.
+            The least recently used objects are evicted.
+        --catalog=CONNSTRING
+            Read tables and views from data dictionary of
+            the database, connecting with CONNSTRING,
+            rather than from SQL files.
         -c, --title-char=TITLECHAR
             Characters for title underlines.
             If ONE character, only tables are rendered.
@@ -321,20 +827,73 @@ def main(argv):
             for "Tables" or "Views" captions, second - for
             table and viewnames themselves.
             Default: ~
+        --driver=DRIVER
+            Database driver of --catalog and --baseline-catalog:
+            "oracle", "sqlite" or name of DB-API module.
+            Default: oracle
         -h, --help
             Display this help message.
+        -j, --jobs=JOBS
+            Number of processes, parsing several SQL files
+            in parallel. Default: 1
+        --lineage
+            Resolve columns of views to columns of tables, they
+            are selected from (through aliases and nested views).
+            Show them and fill in missing descriptions of columns
+            of views from them.
         -o, --output=FILENAME
             Output file. By default - sql_filename with
             asciidoc extension. If "-" is specified as FILENAME,
-            output is written to stdout.
+            output is written to stdout. If FILENAME is
+            a directory, output of --catalog is written
+            to catalog.asciidoc in it.
+        --owner=OWNER
+            Owner (schema) of the objects, read with --catalog
+            or --baseline-catalog.
+            By default, objects of all owners are read,
+            and their names are qualified with owners.
         -m, --comments
             Generate SQL comments rather than asciidoc output
+        --profile=FILENAME
+            Profile the run with cProfile and write the profile
+            to FILENAME (may be read with pstats module).
+        --stats
+            Write timings and counters of processing stages
+            (reading, parsing, rendering, linking, writing) to stderr.
+        --stats-json=FILENAME
+            Write timings and counters of processing stages
+            to FILENAME in JSON format.
+        --split=DIRECTORY
+            Write each table and view to its own file in DIRECTORY,
+            and index.asciidoc, including them. Only the files,
+            which contents changed, are rewritten (hashes of the
+            contents are kept in manifest.json).
+        --stream
+            Parse SQL statement by statement while reading it,
+            without loading the whole file into memory.
         -v, --verbose
             Write detailed information to stderr.
+        --watch
+            Keep running, watching SQL files for changes, and
+            write the output again whenever they change. Only
+            changed statements are parsed, and only changed
+            tables and views are rendered. Requires SQL files,
+            merged into single output file, or --split.
+            Stop with Ctrl+C.
+        --watch-interval=SECONDS
+            Interval of checking SQL files with --watch.
+            Default: 1
     Note:
         If sql_filename is not specified, SQL is expected from
         stdin. In this case output goes to stdout as well,
         unless -o parameter is specified.
+
+        Several files, directories (searched for *.sql files)
+        and glob patterns may be specified. They are merged into
+        one document if FILENAME of -o parameter is a file or "-".
+        Otherwise each file is rendered to its own output
+        (sql_filename with asciidoc extension), placed into
+        the directory, specified as FILENAME, or the current one.
     """
 
     def log_error(s):
@@ -343,26 +902,44 @@ def main(argv):
     def log(s):
         pass
 
-    global TEXT_INCLS
-    TEXT_INCLS = []
-
     command = os.path.split(argv[0])[1]
     params = {}
     cpt_char = None
     comments = False
+    stream = False
+    with_lineage = False
+    jobs = 1
+    outfile = None
+    cache_dir = None
+    cache_max_age = 30
+    cache_max_size = None
+    stats = NULL_STATS
+    print_stats = False
+    stats_json = None
+    profile = None
+    connstr = None
+    driver = dbapi.DEFAULT_DRIVER
+    owner = None
+    split_dir = None
+    watch = False
+    watch_interval = 1.0
+    baseline_file = None
+    baseline_connstr = None
+    apply_comments = False
 
     #Extract options
     try:
         opts, args = getopt.getopt(
             argv[1:],
-            "c:a:t:r:A:V:R:o:vmh",
+            "c:a:t:r:A:V:R:o:j:vmh",
             ["title-char=",
              "table-attributes=", "table-header=", "row-pattern=",
              "view-table-attributes=", "view-header=", "view-row-pattern=",
-             "output=", "verbose", "comments", "help"])
-
-        infile = args and args[0] or None
-        outfile = infile and "%s.asciidoc" % os.path.splitext(os.path.split(infile)[1])[0] or '-'
+             "output=", "jobs=", "verbose", "comments", "stream", "help",
+             "cache-dir=", "cache-max-age=", "cache-max-size=",
+             "stats", "stats-json=", "profile=",
+             "catalog=", "driver=", "owner=", "split=", "lineage",
+             "watch", "watch-interval=", "baseline=", "baseline-catalog=", "apply"])
 
     except getopt.GetoptError, err:
         log_error(main.__doc__ % locals())
@@ -388,13 +965,184 @@ def main(argv):
             outfile = a
         elif o in ("-m", "--comments"):
             comments = True
+        elif o == "--stream":
+            stream = True
+        elif o in ("-j", "--jobs"):
+            try:
+                jobs = int(a)
+            except ValueError:
+                jobs = 0
+            if jobs <= 0:
+                log_error("Error: Invalid number of jobs: %s" % a)
+                return -2
+        elif o == "--cache-dir":
+            cache_dir = a
+        elif o == "--stats":
+            print_stats = True
+            stats = Stats()
+        elif o == "--stats-json":
+            stats_json = a
+            stats = Stats()
+        elif o == "--profile":
+            profile = a
+        elif o == "--catalog":
+            connstr = a
+        elif o == "--driver":
+            driver = a
+        elif o == "--owner":
+            owner = a
+        elif o == "--split":
+            split_dir = a
+        elif o == "--lineage":
+            with_lineage = True
+        elif o == "--watch":
+            watch = True
+        elif o == "--baseline":
+            baseline_file = a
+        elif o == "--baseline-catalog":
+            baseline_connstr = a
+        elif o == "--apply":
+            apply_comments = True
+        elif o in ("--cache-max-age", "--cache-max-size", "--watch-interval"):
+            try:
+                a = float(a)
+            except ValueError:
+                log_error("Error: Invalid value of %s: %s" % (o, a))
+                return -2
+            if o == "--cache-max-age":
+                cache_max_age = a
+            elif o == "--watch-interval":
+                watch_interval = a
+            else:
+                cache_max_size = a
         elif o in ("-h", "--help"):
             print main.__doc__ % locals()
             return 0
 
+    def asciidoc_name(infile):
+        return "%s.asciidoc" % os.path.splitext(os.path.split(infile)[1])[0]
+
+    def resolve(schema):
+        # Resolve columns of views to columns of tables
+        if with_lineage:
+            with stats.stage('lineage'):
+                n = resolve_lineage(schema)
+            stats.count('lineage', views=len(schema.views), columns=n)
+        return schema
+
+    def comment_chunks(schema):
+        objs = schema.objects()
+        if baseline is None:
+            return iter_objects_comments(objs)
+
+        # Only comments, changed since the baseline
+        with stats.stage('diff'):
+            changes = comments_diff(objs, baseline)
+        stats.count('diff', objects=len(changes),
+                    comments=sum([len(c) for o, c in changes]))
+        if apply_comments:
+            statements = [comment_statement(o.name, colname, comment)
+                          for o, c in changes for colname, comment in c]
+            log("Executing %d comments..." % len(statements))
+            catalog.write_comments(baseline_connection, statements, driver, stats=stats)
+        return iter_comments_diff(changes)
+
+    def render(schema):
+        resolve(schema)
+        if comments:
+            stats.count('render', objects=len(schema.objects()))
+            return stats.timed('render', comment_chunks(schema))
+        return iter_schema_asciidoc(schema, cpt_char, stats=stats, **params)
+
+    def write(chunks, outfile):
+        # Chunks are written as soon as they are rendered
+        log("Rendering and writing file %s ..." % (outfile or "<stdout>"))
+        f = outfile and open(outfile, "w") or sys.stdout
+        for chunk in chunks:
+            with stats.stage('write'):
+                f.write(chunk)
+            stats.count('write', bytes=len(chunk))
+        f.close()
+        stats.count('write', files=1)
+
+    def watch_files():
+        # Keep the model of the files in memory and write
+        # the output whenever they change
+        model = WarmSchema(infiles, with_lineage, stats)
+        context = None
+        log("Watching %d files (press Ctrl+C to stop)..." % len(infiles))
+        try:
+            while True:
+                t = time.time()
+                changed = model.update()
+                if changed is not None:
+                    schema = model.schema
+                    if comments:
+                        write(comment_chunks(schema), outfile)
+                    else:
+                        context = RenderContext(schema, cpt_char, stats=stats,
+                                                previous=context, keep=True, **params)
+                        if split_dir:
+                            write_split(context, split_dir)
+                        else:
+                            write(context, outfile)
+                    log("%d objects changed, written in %d ms" % (
+                        len(changed), (time.time() - t) * 1000))
+                time.sleep(watch_interval)
+        except KeyboardInterrupt:
+            log("Stopped.")
+
+    if (baseline_file or baseline_connstr) and not comments:
+        log_error("Error: Baseline can be specified only with comments (-m).")
+        return -2
+    if baseline_file and baseline_connstr:
+        log_error("Error: Only one of --baseline and --baseline-catalog may be specified.")
+        return -2
+    if apply_comments and (not baseline_connstr or watch):
+        log_error("Error: --apply requires --baseline-catalog and can't be used with --watch.")
+        return -2
+    if apply_comments and driver == 'sqlite':
+        log_error("Error: --apply can't be used with sqlite driver, "
+                  "as SQLite has no COMMENT ON statements.")
+        return -2
+
+    # Expand directories and patterns
+    infiles = find_sql_files(args)
+    if args and not infiles:
+        log_error("Error: No SQL files found.")
+        return -2
+    infile = infiles and infiles[0] or None
+    if connstr and infiles:
+        log_error("Error: SQL files can't be specified with --catalog.")
+        return -2
+
+    if split_dir and (comments or outfile):
+        log_error("Error: Split output can't be specified with comments or output file.")
+        return -2
+
+    # Output directory, if each file is rendered separately
+    outdir = None
+    if split_dir:
+        pass
+    elif outfile is None:
+        if len(infiles) > 1:
+            outdir = os.curdir
+        else:
+            outfile = infile and asciidoc_name(infile) or '-'
+    elif os.path.isdir(outfile):
+        if connstr:
+            # Catalog is rendered to single file of the directory
+            outfile = os.path.join(outfile, CATALOG_OUTPUT)
+        else:
+            outdir = outfile
+
     if outfile=='-':
         outfile = None
 
+    if watch and not (infiles and outdir is None and (split_dir or outfile)):
+        log_error("Error: Watch mode requires SQL files and single output file or --split.")
+        return -2
+
     if comments:
         log("Generating SQL COMMENTS from SQL")
         log("================================")
@@ -402,46 +1150,104 @@ def main(argv):
         log("Generating ASCIIDOC from SQL")
         log("============================")
 
+    cache = None
+    if cache_dir:
+        cache = FileCache(cache_dir,
+                          max_age = cache_max_age * 24 * 3600,
+                          max_size = cache_max_size and int(cache_max_size * 1024 * 1024))
+
+    if profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    baseline = None
+    baseline_connection = None
+
     try:
-        # Read SQL
-        log("Reading file %s ..." % infile)
-        f = infile and open(infile) or sys.stdin
-        sql = f.read()
-        f.close()
+        if baseline_file:
+            log("Parsing baseline file %s ..." % baseline_file)
+            with stats.stage('baseline'):
+                f = open(baseline_file)
+                try:
+                    baseline = parse_schema(f.read()).objects()
+                finally:
+                    f.close()
+            stats.count('baseline', objects=len(baseline))
+        elif baseline_connstr:
+            log("Reading baseline catalog...")
+            baseline_connection = dbapi.connect(baseline_connstr, driver)
+            baseline = catalog.read_schema(baseline_connection, owner,
+                                           stats=stats).objects()
+
+        if watch:
+            watch_files()
+
+        elif outdir is not None:
+            outfiles = [os.path.join(outdir, asciidoc_name(fn)) for fn in infiles]
+            if len(set(outfiles)) < len(outfiles):
+                log_error("Error: Several SQL files have the same name.")
+                return -2
+
+            # Parse and render each file separately
+            log("Parsing %d files..." % len(infiles))
+            with stats.stage('parse'):
+                schemas = parse_files(infiles, jobs, merge=False, stream=stream,
+                                      views=bool(comments or cpt_char),
+                                      cache=cache)
+            stats.count('parse', files=len(infiles))
+            for schema, outfile in zip(schemas, outfiles):
+                write(render(schema), outfile)
 
-        if comments:
-            ret = objects_to_comments(sql)
         else:
-            ret = TOP_COMMENT
-
-            if cpt_char:
-                ret += "\n\n%s\n%s\n" % (TABLES_CPT, cpt_char*len(TABLES_CPT))
-
-            # Parse Tables from SQL
-            log("Parsing Tables...")
-            ret += tables_to_asciidoc(sql, **params)
-
-            if cpt_char:
-                # Parse Views from SQL
-                vws = views_to_asciidoc(sql, **params)
-                log("Parsing Views...")
-                if vws.strip():
-                    ret += "\n\n%s\n%s\n" % (VIEWS_CPT, cpt_char*len(VIEWS_CPT))
-                    ret += vws
-                
-
-            # Making title references
-            ret = asciidoc.make_title_references(ret)
-            
-            # Making text inclusions of the Views
-            for i in range(len(TEXT_INCLS)):
-                ret = ret.replace("INCLUSION_%d" % i, TEXT_INCLS[i])
+            if connstr:
+                # Read data dictionary
+                log("Reading catalog...")
+                connection = dbapi.connect(connstr, driver)
+                try:
+                    schema = catalog.read_schema(connection, owner,
+                                                 views=bool(comments or cpt_char),
+                                                 stats=stats)
+                finally:
+                    connection.close()
+            elif len(infiles) > 1:
+                # Parse and merge all files
+                log("Parsing %d files..." % len(infiles))
+                with stats.stage('parse'):
+                    schema = parse_files(infiles, jobs, stream=stream,
+                                         views=bool(comments or cpt_char),
+                                         cache=cache)
+                stats.count('parse', files=len(infiles))
+            else:
+                # Read and parse SQL
+                log("Reading file %s ..." % infile)
+                f = infile and open(infile) or sys.stdin
+                if stream or cache:
+                    log("Parsing SQL statements...")
+                    schema = parse_schema_stream(f, cache=cache, stats=stats)
+                else:
+                    with stats.stage('read'):
+                        sql = f.read()
+                    stats.count('read', bytes=len(sql))
+                    log("Parsing SQL...")
+                    schema = parse_schema(sql, views=bool(comments or cpt_char),
+                                          stats=stats)
+                f.close()
+
+            if split_dir:
+                log("Rendering and writing files to %s ..." % split_dir)
+                written, unchanged, deleted = write_split(
+                    RenderContext(resolve(schema), cpt_char, stats=stats, **params),
+                    split_dir)
+                log("%d files written, %d unchanged, %d deleted" % (
+                    written, unchanged, deleted))
+            else:
+                # Write SQL
+                write(render(schema), outfile)
 
-        # Write SQL
-        log("Writing file %s ..." % outfile)
-        f = outfile and open(outfile, "w") or sys.stdout
-        f.write(ret)
-        f.close()
+        if cache:
+            if cache.hits or cache.misses:
+                log("Cache: %d hits, %d misses" % (cache.hits, cache.misses))
+            log("Cache: %d entries evicted" % cache.evict())
 
         log("Done!")
         
@@ -449,5 +1255,20 @@ def main(argv):
         log_error("Error: %s" % err)
         raise
 
+    finally:
+        if baseline_connection is not None:
+            baseline_connection.close()
+        if profile:
+            profiler.disable()
+            profiler.dump_stats(profile)
+            log("Profile written to %s" % profile)
+
+    if print_stats:
+        log_error(stats.summary())
+    if stats_json:
+        f = open(stats_json, "w")
+        json.dump(stats.as_dict(), f, indent=2, sort_keys=True)
+        f.close()
+
     log("")
     return 0
@@ -0,0 +1,121 @@
+# Author: David Avsajanishvili
+# Contact: avsd05@gmail.com
+
+"""
+Collecting of timings and counters of processing stages
+"""
+
+__all__ = ['Stats', 'NULL_STATS']
+
+import time
+from contextlib import contextmanager
+
+class Stats(object):
+    """
+    Collects wall time and counters (numbers of objects,
+    bytes etc.) of processing stages, in order of their start.
+
+    Usage:
+
+        stats = Stats()
+        with stats.stage('read'):
+            sql = f.read()
+        stats.count('read', bytes=len(sql))
+        print stats.summary()
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.times = {}
+        self.counters = {}
+
+    def _add(self, name):
+        if name not in self.times:
+            self.stages.append(name)
+            self.times[name] = 0.0
+            self.counters[name] = {}
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager, adding time of the block to stage
+        """
+
+        self._add(name)
+        t = time.time()
+        try:
+            yield self
+        finally:
+            self.times[name] += time.time() - t
+
+    def timed(self, name, iterable):
+        """
+        Yields items of iterable, adding time of producing
+        them to stage and their total length to its "bytes"
+        """
+
+        it = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = it.next()
+                except StopIteration:
+                    return
+            self.count(name, bytes=len(item))
+            yield item
+
+    def count(self, name, **counters):
+        """
+        Adds values of counters to stage
+        """
+
+        self._add(name)
+        c = self.counters[name]
+        for k, v in counters.iteritems():
+            c[k] = c.get(k, 0) + v
+
+    def summary(self):
+        """
+        Returns summary of stages as text table
+        """
+
+        ret = ["%-20s %10s  %s" % ("Stage", "Time, s", "Counters")]
+        for name in self.stages:
+            c = self.counters[name]
+            ret.append("%-20s %10.4f  %s" % (
+                name, self.times[name],
+                ", ".join(["%s=%s" % (k, c[k]) for k in sorted(c)])))
+        ret.append("%-20s %10.4f" % ("total", sum(self.times.values())))
+
+        return "\n".join(ret)
+
+    def as_dict(self):
+        """
+        Returns stages as dictionary, suitable for JSON
+        """
+
+        return {
+            'stages': [{'name': name,
+                        'seconds': self.times[name],
+                        'counters': self.counters[name]}
+                       for name in self.stages],
+            'total': sum(self.times.values()),
+        }
+
+class NullStats(Stats):
+    """
+    Stats, collecting nothing
+    """
+
+    @contextmanager
+    def stage(self, name):
+        yield self
+
+    def timed(self, name, iterable):
+        return iterable
+
+    def count(self, name, **counters):
+        pass
+
+# Default stats of functions, called without them
+NULL_STATS = NullStats()
@@ -0,0 +1,174 @@
+# Author: David Avsajanishvili
+# Contact: avsd05@gmail.com
+
+"""
+Warm in-memory model of SQL files, updated incrementally
+when the files change
+"""
+
+__all__ = ['WarmSchema']
+
+import os
+import cPickle as pickle
+
+from db import Schema, SchemaBuilder, View, split_statements, parse_statement, \
+    remove_sql_comments, normalize_name, _apply_comments
+from lineage import resolve_lineage
+from stats import NULL_STATS
+
+class WarmSchema(object):
+    """
+    Schema of SQL files, kept in memory and updated, when
+    the files change.
+
+    Usage:
+
+        model = WarmSchema(['tables.sql', 'comments.sql'])
+        model.update()
+        while True:
+            time.sleep(1)
+            changed = model.update()
+            if changed is not None:
+                print len(changed), model.schema
+
+    Only the changed files are read again, and only the statements,
+    which were not seen before, are parsed. Objects, which statements,
+    comments and privileges didn't change, are kept as they were,
+    so the rendered chunks may be reused by their identity
+    (see script_tools.RenderContext).
+
+    If lineage is True, columns of views are resolved (see
+    lineage.resolve_lineage); as their origins depend on other
+    objects, views are rebuilt on each change.
+    """
+
+    def __init__(self, filenames, lineage=False, stats=None):
+        self.filenames = list(filenames)
+        self.lineage = lineage
+        self.stats = stats or NULL_STATS
+        self.schema = None
+
+        # Modification stamp and list of (statement, parsed statement)
+        # of each file
+        self._files = {}
+
+        # Parsed statements by their text, with SQL comments. Objects
+        # of CREATE statements are kept without comments and privileges.
+        self._parsed = {}
+
+        # Signature and finished object by object of CREATE statement
+        self._finished = {}
+
+    def _stamp(self, fn):
+        st = os.stat(fn)
+        return st.st_mtime, st.st_size
+
+    def _load(self, fn):
+        """
+        Reads file and returns list of its parsed statements
+        """
+
+        f = open(fn)
+        try:
+            sql = f.read()
+        finally:
+            f.close()
+
+        ret = []
+        parsed = self._parsed
+        n = 0
+        for raw in split_statements(sql):
+            if raw not in parsed:
+                stmt = remove_sql_comments(raw).strip()
+                parsed[raw] = stmt and parse_statement(stmt) or None
+                n += 1
+            ret.append((raw, parsed[raw]))
+        self.stats.count('parse', statements=len(ret), parsed=n)
+
+        return ret
+
+    def _reload(self):
+        """
+        Reloads changed files. Returns True if any file changed.
+        Files, which can't be read (e.g. being saved), keep
+        their previous statements.
+        """
+
+        changed = False
+        for fn in self.filenames:
+            try:
+                stamp = self._stamp(fn)
+                if fn in self._files and self._files[fn][0] == stamp:
+                    continue
+                self._files[fn] = stamp, self._load(fn)
+            except (IOError, OSError):
+                if fn not in self._files:
+                    raise
+                continue
+            changed = True
+
+        # Forget statements, removed from the files
+        live = sum([len(v[1]) for v in self._files.itervalues()])
+        if len(self._parsed) > 2 * live:
+            self._parsed = dict([t for v in self._files.itervalues() for t in v[1]])
+
+        return changed
+
+    def _copy(self, obj):
+        """
+        Returns copy of object of CREATE statement to be finished
+        """
+
+        return pickle.loads(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL))
+
+    def update(self):
+        """
+        Reloads changed files and rebuilds the schema.
+        Returns list of new or changed objects of the schema,
+        or None if none of the files changed.
+        """
+
+        stats = self.stats
+        with stats.stage('parse'):
+            if not self._reload() and self.schema is not None:
+                return None
+
+            builder = SchemaBuilder()
+            for fn in self.filenames:
+                for stmt, parsed in self._files[fn][1]:
+                    builder.apply(parsed)
+            parsed = builder.schema
+
+        with stats.stage('finish'):
+            tab_comments = parsed.tab_comments
+            col_comments = parsed.col_comments
+            grants = parsed.grants
+
+            schema = Schema(tab_comments=tab_comments, col_comments=col_comments,
+                            grants=grants)
+            finished = {}
+            changed = []
+            for obj, nm in builder._objects:
+                is_view = isinstance(obj, View)
+                signature = (nm, tab_comments.get(nm), col_comments.get(obj.name),
+                             grants.get(normalize_name(obj.name)))
+                prev = self._finished.get(obj)
+                if prev is not None and prev[0] == signature and \
+                        not (self.lineage and is_view) and obj not in finished:
+                    new = prev[1]
+                else:
+                    new = self._copy(obj)
+                    _apply_comments(new, nm, tab_comments, col_comments)
+                    new.apply_privileges(grants)
+                    changed.append(new)
+                finished.setdefault(obj, (signature, new))
+                (schema.views if is_view else schema.tables).append(new)
+            self._finished = finished
+        stats.count('finish', objects=len(builder._objects), changed=len(changed))
+
+        if self.lineage:
+            with stats.stage('lineage'):
+                resolve_lineage(schema)
+
+        self.schema = schema
+        return changed